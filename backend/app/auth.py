@@ -8,7 +8,7 @@ import hmac
 import json
 from typing import Optional
 from urllib.parse import parse_qsl
-from fastapi import Header, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from app.settings import settings
 
 
@@ -77,21 +77,33 @@ def verify_telegram_init_data(init_data: str, bot_token: str) -> dict:
         )
 
 
-async def get_current_user(
+# Профиль в режиме разработки (без initData)
+DEBUG_PROFILE = {
+    'user_id': "test_user",
+    'username': None,
+    'first_name': None,
+    'last_name': None,
+    'language_code': None,
+    'is_premium': False,
+    'auth_date': None,
+}
+
+
+async def get_current_profile(
     x_telegram_init_data: Optional[str] = Header(None, alias="X-Telegram-Init-Data")
-) -> str:
+) -> dict:
     """
-    Dependency для получения текущего пользователя из заголовка.
+    Dependency: профиль текущего пользователя из проверенного initData.
     
     В разработке можно отключить проверку, установив DEBUG=true.
     В продакшене обязательно проверяет подпись Telegram.
     
     Returns:
-        user_id как строка
+        dict из verify_telegram_init_data
     """
     # В режиме разработки можно пропустить аутентификацию
     if settings.debug and not x_telegram_init_data:
-        return "test_user"
+        return dict(DEBUG_PROFILE)
     
     if not x_telegram_init_data:
         raise HTTPException(
@@ -107,8 +119,20 @@ async def get_current_user(
             detail="Не настроен токен бота"
         )
     
-    user_info = verify_telegram_init_data(x_telegram_init_data, bot_token)
-    return user_info['user_id']
+    return verify_telegram_init_data(x_telegram_init_data, bot_token)
+
+
+async def get_current_user(profile: dict = Depends(get_current_profile)) -> str:
+    """
+    Dependency для получения текущего пользователя из заголовка.
+    
+    Подпись проверяется в get_current_profile; в пределах запроса FastAPI
+    вызывает её один раз, даже если нужны и профиль, и user_id.
+    
+    Returns:
+        user_id как строка
+    """
+    return profile['user_id']
 
 
 async def get_current_user_optional(
@@ -118,6 +142,7 @@ async def get_current_user_optional(
     Опциональная аутентификация (не требует обязательной авторизации).
     """
     try:
-        return await get_current_user(x_telegram_init_data)
+        profile = await get_current_profile(x_telegram_init_data)
+        return profile['user_id']
     except HTTPException:
         return None
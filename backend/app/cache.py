@@ -0,0 +1,57 @@
+# -*- coding: utf-8 -*-
+"""
+Кэш производных данных пользователя (статистика и т.п.) в памяти процесса.
+
+Записи сбрасываются при любой записи задач пользователя (crud вызывает
+invalidate) и, опционально, по истечении срока. Кэш локален для процесса,
+поэтому crud включает в ключи версию данных пользователя (user_data_versions):
+запись через другой воркер меняет версию, и старые значения не читаются.
+"""
+import threading
+import time
+from typing import Any, Hashable, Optional
+
+
+class UserCache:
+    """Значения по ключу в разрезе пользователя: {user_id: {key: (истекает, значение)}}."""
+
+    def __init__(self, max_users: int = 10000):
+        self.max_users = max_users
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id: str, key: Hashable) -> Optional[Any]:
+        """Значение из кэша или None, если его нет или срок истёк."""
+        with self._lock:
+            entry = self._entries.get(user_id, {}).get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[user_id][key]
+                return None
+            return value
+
+    def set(self, user_id: str, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Сохранить значение; ttl в секундах (None — до следующей записи пользователя)."""
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            entries = self._entries.pop(user_id, {})
+            entries[key] = (expires_at, value)
+            # Словарь упорядочен по последней записи: вытесняем самых давних пользователей
+            self._entries[user_id] = entries
+            while len(self._entries) > self.max_users:
+                del self._entries[next(iter(self._entries))]
+
+    def invalidate(self, user_id: str) -> None:
+        """Сбросить все значения пользователя (после изменения его задач)."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Сбросить весь кэш."""
+        with self._lock:
+            self._entries.clear()
+
+
+cache = UserCache()
@@ -1,66 +1,466 @@
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
+from sqlalchemy import or_, and_, any_, bindparam, column, func, cast, exists, literal, literal_column, select, type_coerce, values, Date, Integer, REAL
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from . import models, schemas
-from .exceptions import TaskNotFoundError
-from typing import List, Optional
-from datetime import datetime
+from .cache import cache
+from .exceptions import TaskNotFoundError, ValidationError, SyncTokenExpiredError, VersionConflictError
+from .pagination import encode_cursor, decode_cursor
+from typing import Any, List, Optional, Sequence, Tuple
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
-def get_tasks(
-    db: Session, 
+# Конфигурация полнотекстового поиска; должна совпадать с выражением
+# генерируемой колонки tasks.search_vector (миграция 007_task_search_vector)
+SEARCH_CONFIG = "russian"
+
+# tsvector по названию (вес A) и описанию (вес B). Колонка генерируется
+# в Postgres и не отображается в модели, чтобы не читать её в списках.
+search_vector = literal_column("tasks.search_vector")
+
+# Триграммный GIN обслуживает ILIKE от трёх символов; более короткий
+# фрагмент ищется по началу названия через B-tree ix_tasks_user_title_prefix
+SHORT_SEARCH_LENGTH = 3
+
+# Нечёткий поиск отдаёт одну страницу не больше этого размера:
+# дальше похожесть уже слишком низкая, чтобы быть полезной
+FUZZY_SEARCH_LIMIT = 50
+
+# Ключи сортировки для keyset-пагинации: (выражение, тип значения, по убыванию, допускает NULL).
+# Последний ключ всегда id — он делает порядок строгим, а курсор однозначным.
+# NULL во всех режимах идут в конце.
+SORT_KEYS = {
+    "position": [
+        (models.Task.position, int, False, True),
+        (models.Task.created_at, datetime, True, True),
+        (models.Task.id, int, True, False),
+    ],
+    "date": [
+        (models.Task.date_time, datetime, True, True),
+        (models.Task.id, int, True, False),
+    ],
+    "priority": [
+        (models.Task.priority_rank, int, True, False),
+        (models.Task.position, int, False, True),
+        (models.Task.id, int, True, False),
+    ],
+    "title": [
+        (models.Task.title, str, False, False),
+        (models.Task.id, int, False, False),
+    ],
+    # «Что делать дальше»: открытые раньше выполненных, внутри — по убыванию
+    # приоритета, затем по сроку. Просроченные задачи имеют самый ранний срок,
+    # поэтому идут первыми, задачи без срока — последними.
+    "urgency": [
+        (models.Task.status, bool, False, True),
+        (models.Task.priority_rank, int, True, False),
+        (models.Task.date_time, datetime, False, True),
+        (models.Task.id, int, False, False),
+    ],
+}
+
+
+# Колонки полной задачи для списков. Списки читаются через Core select():
+# строки не превращаются в ORM-объекты и не попадают в identity map сессии,
+# а схемы ответа читают поля строки напрямую (from_attributes)
+TASK_COLUMNS = [
+    *models.Task.__table__.columns,
+    models.Task.priority.label("priority"),
+]
+
+# Колонки облегчённого списка (view=compact): без описания и служебных полей,
+# чтобы не читать description из TOAST и не гонять его по сети
+COMPACT_COLUMNS = [
+    models.Task.id,
+    models.Task.title,
+    models.Task.priority.label("priority"),
+    models.Task.status,
+    models.Task.date_time,
+    models.Task.position,
+    models.Task.category,
+    models.Task.tags,
+]
+
+
+def _is_postgres(db: Session) -> bool:
+    """Работаем ли с Postgres (в тестах используется SQLite)."""
+    return db.get_bind().dialect.name == "postgresql"
+
+
+def _search_query(search: str):
+    """tsquery для строки поиска в синтаксисе веб-поиска ("фраза", -исключение, OR)."""
+    return func.websearch_to_tsquery(SEARCH_CONFIG, search)
+
+
+def _similarity(search: str):
+    """
+    Триграммная похожесть задачи на строку поиска.
+
+    Для названия — similarity() целиком, для описания — word_similarity():
+    длинный текст целиком никогда не похож на короткий запрос, а вот
+    отдельные слова в нём — да.
+    """
+    return func.greatest(
+        func.similarity(models.Task.title, search),
+        func.word_similarity(search, models.Task.description),
+        type_=REAL,
+    )
+
+
+def _search_condition(db: Session, search: str, search_mode: Optional[str] = "substring"):
+    """
+    Условие поиска по названию и описанию.
+
+    В Postgres:
+    - substring (по умолчанию) — ILIKE по подстроке, обслуживается триграммными
+      GIN-индексами, находит и начало слова при поиске по мере ввода;
+      фрагмент короче SHORT_SEARCH_LENGTH ищется только по началу названия
+      (индекс ix_tasks_user_title_prefix), иначе пришлось бы читать все задачи;
+    - fulltext — полнотекстовый поиск по GIN-индексу search_vector (только целые слова);
+    - fuzzy — триграммная похожесть (% и <%), терпит опечатки.
+    В SQLite (тесты) любой режим — ILIKE по подстроке.
+    """
+    if _is_postgres(db) and search_mode == "fuzzy":
+        return or_(
+            models.Task.title.op("%")(search),
+            literal(search).op("<%")(models.Task.description),
+        )
+    if _is_postgres(db) and search_mode == "fulltext":
+        return search_vector.op("@@")(_search_query(search))
+    if _is_postgres(db) and len(search) < SHORT_SEARCH_LENGTH:
+        # Выражение должно совпадать с индексом: lower(title) text_pattern_ops
+        return func.lower(models.Task.title).startswith(search.lower(), autoescape=True)
+    
+    search_pattern = f"%{search}%"
+    return or_(
+        models.Task.title.ilike(search_pattern),
+        models.Task.description.ilike(search_pattern)
+    )
+
+
+def _tags_condition(db: Session, tags: List[str], tag_mode: Optional[str] = "all"):
+    """
+    Условие по тегам: all — задача содержит все теги, any — хотя бы один.
+
+    В Postgres это @> по jsonb, который обслуживается GIN-индексом
+    ix_tasks_tags (режим any — объединение таких условий, BitmapOr).
+    В SQLite — проверка через json_each.
+    """
+    if _is_postgres(db):
+        # Колонка объявлена как JSON с вариантом JSONB: операторы jsonb берём явно
+        task_tags = type_coerce(models.Task.tags, JSONB)
+        if tag_mode == "any":
+            return or_(*[task_tags.contains([tag]) for tag in tags])
+        return task_tags.contains(tags)
+    
+    tag_values = func.json_each(models.Task.tags).table_valued("value")
+    conditions = [
+        exists(select(1).select_from(tag_values).where(tag_values.c.value == tag))
+        for tag in tags
+    ]
+    return or_(*conditions) if tag_mode == "any" else and_(*conditions)
+
+
+def _sort_keys(
+    db: Session,
+    sort_by: Optional[str],
+    search: Optional[str] = None,
+    search_mode: Optional[str] = "substring"
+) -> Tuple[str, list]:
+    """
+    Режим сортировки и его ключи.
+
+    Нечёткий поиск в Postgres всегда сортирует по похожести. relevance
+    доступна только при полнотекстовом поиске в Postgres, иначе, как и
+    неизвестный режим, заменяется сортировкой по позиции.
+    """
+    if search and _is_postgres(db):
+        if search_mode == "fuzzy":
+            return "similarity", [
+                (_similarity(search), float, True, False),
+                (models.Task.id, int, True, False),
+            ]
+        if sort_by == "relevance" and search_mode == "fulltext":
+            rank = func.ts_rank(search_vector, _search_query(search), type_=REAL)
+            return sort_by, [
+                (rank, float, True, False),
+                (models.Task.id, int, True, False),
+            ]
+    if sort_by not in SORT_KEYS:
+        sort_by = "position"
+    return sort_by, SORT_KEYS[sort_by]
+
+
+def _order_by(keys: list) -> list:
+    """ORDER BY для ключей сортировки."""
+    clauses = []
+    for column, _, descending, nullable in keys:
+        clause = column.desc() if descending else column.asc()
+        clauses.append(clause.nullslast() if nullable else clause)
+    return clauses
+
+
+def _after_cursor(keys: list, values: list):
+    """
+    Условие «строго после курсора» для составного ключа сортировки.
+
+    Раскрывается в (k1 > v1) OR (k1 = v1 AND k2 > v2) OR ... с учётом
+    направления каждого ключа и того, что NULL стоят в конце.
+    """
+    branches = []
+    equal = []
+    for (column, kind, descending, nullable), value in zip(keys, values):
+        if value is None:
+            # После NULL по этому ключу идут только строки с тем же NULL
+            equal.append(column.is_(None))
+            continue
+        if kind is float:
+            # ts_rank возвращает real: сравниваем в той же точности, иначе
+            # равенство с округлённым в JSON значением не выполнится
+            value = cast(value, REAL)
+        elif kind is bool:
+            # С литералами True/False SQLAlchemy разрешает только = и IS
+            value = literal(value)
+        after = column < value if descending else column > value
+        if nullable:
+            after = or_(after, column.is_(None))
+        branches.append(and_(*equal, after))
+        equal.append(column == value)
+    return or_(*branches)
+
+
+def _filter_conditions(
+    db: Session,
     user_id: str,
-    skip: int = 0,
-    limit: int = 100,
     status: Optional[bool] = None,
     priority: Optional[str] = None,
     search: Optional[str] = None,
     category: Optional[str] = None,
-    tag: Optional[str] = None,
-    sort_by: Optional[str] = "position"  # position, date, priority, title
-) -> List[models.Task]:
-    """Получить задачи с фильтрацией и пагинацией."""
-    query = db.query(models.Task).filter(models.Task.user_id == user_id)
+    tags: Optional[List[str]] = None,
+    tag_mode: Optional[str] = "all",
+    search_mode: Optional[str] = "substring"
+) -> list:
+    """
+    Условия WHERE для фильтров списка задач.
+
+    Общие для выборки (_query_tasks) и массовых изменений по фильтру
+    (update_tasks_where, delete_tasks_where).
+    """
+    conditions = [models.Task.user_id == user_id]
     
     # Фильтр по статусу
     if status is not None:
-        query = query.filter(models.Task.status == status)
+        conditions.append(models.Task.status == status)
     
     # Фильтр по приоритету
     if priority:
-        query = query.filter(models.Task.priority == priority)
+        conditions.append(models.Task.priority_rank == models.PRIORITY_RANKS.get(priority))
     
     # Фильтр по категории
     if category:
-        query = query.filter(models.Task.category == category)
+        conditions.append(models.Task.category == category)
     
-    # Фильтр по тегу (проверяем наличие в JSON массиве)
-    if tag:
-        query = query.filter(models.Task.tags.contains([tag]))
+    # Фильтр по тегам (все или любой из списка)
+    if tags:
+        conditions.append(_tags_condition(db, tags, tag_mode))
     
     # Поиск по названию и описанию
     if search:
-        search_pattern = f"%{search}%"
-        query = query.filter(
-            or_(
-                models.Task.title.ilike(search_pattern),
-                models.Task.description.ilike(search_pattern)
-            )
-        )
+        conditions.append(_search_condition(db, search, search_mode))
     
-    # Сортировка
-    if sort_by == "date":
-        query = query.order_by(models.Task.date_time.desc().nullslast())
-    elif sort_by == "priority":
-        # Сортировка: high -> normal -> low
-        priority_order = {"high": 1, "normal": 2, "low": 3}
-        query = query.order_by(
-            models.Task.priority.desc()  # Временно, можно улучшить
-        )
-    elif sort_by == "title":
-        query = query.order_by(models.Task.title.asc())
-    else:  # position (default)
-        query = query.order_by(models.Task.position, models.Task.created_at.desc())
+    return conditions
+
+
+def _query_tasks(
+    db: Session, 
+    user_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    tag_mode: Optional[str] = "all",
+    sort_by: Optional[str] = "position",
+    cursor: Optional[str] = None,
+    search_mode: Optional[str] = "substring",
+    view: Optional[str] = "full"
+) -> Tuple[str, list, list]:
+    """
+    Выборка задач вместе со значениями ключа сортировки.
+
+    Только для чтения: возвращает строки (Row) с TASK_COLUMNS при view=full
+    или COMPACT_COLUMNS при view=compact, а не объекты Task.
+
+    Returns:
+        (режим сортировки, строки задач, значения ключа сортировки для каждой строки)
+    """
+    sort_by, keys = _sort_keys(db, sort_by, search, search_mode)
+    columns = COMPACT_COLUMNS if view == "compact" else TASK_COLUMNS
+    sort_columns = [column.label(f"sort_key_{i}") for i, (column, _, _, _) in enumerate(keys)]
+    query = select(*columns, *sort_columns).where(*_filter_conditions(
+        db, user_id, status=status, priority=priority, search=search, category=category,
+        tags=tags, tag_mode=tag_mode, search_mode=search_mode
+    ))
+    
+    if sort_by == "similarity":
+        limit = min(limit, FUZZY_SEARCH_LIMIT)
+    
+    # Сортировка (для каждого режима — строгий порядок с id в конце)
+    query = query.order_by(*_order_by(keys))
+    
+    if cursor:
+        values = decode_cursor(cursor, sort_by, [kind for _, kind, _, _ in keys])
+        query = query.filter(_after_cursor(keys, values))
+    else:
+        query = query.offset(skip)
+    
+    rows = db.execute(query.limit(limit)).all()
+    return sort_by, rows, [list(row[-len(keys):]) for row in rows]
+
+
+def get_tasks(
+    db: Session, 
+    user_id: str,
+    skip: int = 0,
+    limit: int = 100,
+    status: Optional[bool] = None,
+    priority: Optional[str] = None,
+    search: Optional[str] = None,
+    category: Optional[str] = None,
+    tags: Optional[List[str]] = None,
+    tag_mode: Optional[str] = "all",  # all, any
+    sort_by: Optional[str] = "position",  # position, date, priority, title, urgency, relevance
+    cursor: Optional[str] = None,
+    search_mode: Optional[str] = "substring",  # substring, fulltext, fuzzy
+    view: Optional[str] = "full"  # full, compact
+) -> list:
+    """
+    Получить задачи с фильтрацией и пагинацией.
+
+    Если передан cursor, страница начинается сразу после него (keyset),
+    а skip игнорируется. skip оставлен для обратной совместимости.
+    Возвращает строки только для чтения (см. _query_tasks); для изменения
+    задачи используйте get_task_by_id. При view=compact в строках только
+    COMPACT_COLUMNS.
+    """
+    _, tasks, _ = _query_tasks(
+        db, user_id, skip=skip, limit=limit, status=status, priority=priority,
+        search=search, category=category, tags=tags, tag_mode=tag_mode, sort_by=sort_by, cursor=cursor,
+        search_mode=search_mode, view=view
+    )
+    return tasks
+
+
+def get_tasks_page(
+    db: Session,
+    user_id: str,
+    limit: int = 100,
+    **filters
+) -> Tuple[list, Optional[str]]:
+    """
+    Получить страницу задач и курсор следующей страницы.
+
+    Запрашивает на одну строку больше лимита, чтобы узнать, есть ли
+    следующая страница. Курсор равен None, если страница последняя
+    (а также для нечёткого поиска: его выдача — всегда одна страница).
+    """
+    sort_by, tasks, key_values = _query_tasks(db, user_id, limit=limit + 1, **filters)
+    if len(tasks) <= limit or sort_by == "similarity":
+        return tasks[:limit], None
     
-    return query.offset(skip).limit(limit).all()
+    return tasks[:limit], encode_cursor(sort_by, key_values[limit - 1])
+
+
+# Календарь: по возрастанию срока. Задачи без срока в окно не попадают,
+# поэтому NULLS FIRST на результат не влияет, но совпадает с обратным
+# обходом ix_tasks_user_date_time (date_time DESC NULLS LAST, id DESC):
+# окно читается range scan'ом по индексу, без сортировки в плане.
+CALENDAR_KEYS = [
+    (models.Task.date_time, datetime, False, False),
+    (models.Task.id, int, False, False),
+]
+
+
+def get_calendar_page(
+    db: Session,
+    user_id: str,
+    date_from: datetime,
+    date_to: datetime,
+    limit: int = 100,
+    cursor: Optional[str] = None
+) -> Tuple[list, Optional[str]]:
+    """
+    Страница задач со сроком в окне [date_from, date_to) по возрастанию срока.
+
+    Возвращает строки с COMPACT_COLUMNS и курсор следующей страницы (или None).
+    """
+    if date_to <= date_from:
+        raise ValidationError("Начало периода должно быть раньше конца")
+    
+    query = select(*COMPACT_COLUMNS).where(
+        models.Task.user_id == user_id,
+        models.Task.date_time >= date_from,
+        models.Task.date_time < date_to,
+    )
+    if cursor:
+        values = decode_cursor(cursor, "calendar", [kind for _, kind, _, _ in CALENDAR_KEYS])
+        query = query.where(_after_cursor(CALENDAR_KEYS, values))
+    
+    rows = db.execute(
+        query.order_by(models.Task.date_time.asc().nullsfirst(), models.Task.id.asc()).limit(limit + 1)
+    ).all()
+    if len(rows) <= limit:
+        return rows, None
+    
+    last = rows[limit - 1]
+    return rows[:limit], encode_cursor("calendar", [last.date_time, last.id])
+
+
+def get_calendar_summary(db: Session, user_id: str, year: int, month: Optional[int] = None) -> List[dict]:
+    """
+    Счётчики по дням (всего, выполнено, высокий приоритет) за месяц или весь год.
+
+    Возвращаются только дни, на которые есть задачи. Итоги кэшируются
+    по месяцам для текущей версии данных пользователя; за год считаются
+    одним запросом только те месяцы, которых нет в кэше.
+    """
+    version = get_data_version(db, user_id)
+    months = [month] if month else list(range(1, 13))
+    summary = {m: cache.get(user_id, ("calendar_summary", year, m, version)) for m in months}
+    missing = [m for m, days in summary.items() if days is None]
+    
+    if missing:
+        date_from = datetime(year, missing[0], 1)
+        date_to = datetime(year + 1, 1, 1) if missing[-1] == 12 else datetime(year, missing[-1] + 1, 1)
+        date_time = models.Task.date_time
+        if _is_postgres(db):
+            day = cast(func.date_trunc("day", date_time), Date)
+        else:
+            day = func.date(date_time, type_=Date)
+        rows = db.execute(
+            select(
+                day.label("day"),
+                func.count().label("total"),
+                func.count().filter(models.Task.status.is_(True)).label("done"),
+                func.count().filter(models.Task.priority_rank == models.PRIORITY_RANKS["high"]).label("high_priority"),
+            )
+            .where(models.Task.user_id == user_id, date_time >= date_from, date_time < date_to)
+            .group_by(day)
+            .order_by(day)
+        ).all()
+        
+        # Диапазон запроса может накрывать и месяцы из кэша — их списки не трогаем
+        for m in missing:
+            summary[m] = []
+        for row in rows:
+            if row.day.month in missing:
+                summary[row.day.month].append(dict(row._mapping))
+        for m in missing:
+            cache.set(user_id, ("calendar_summary", year, m, version), summary[m])
+    
+    return [day for m in months for day in summary[m]]
 
 
 def get_task_by_id(db: Session, task_id: int, user_id: str) -> models.Task:
@@ -76,58 +476,958 @@ def get_task_by_id(db: Session, task_id: int, user_id: str) -> models.Task:
     return task
 
 
-def create_task(db: Session, task: schemas.TaskCreate, user_id: str) -> models.Task:
-    """Создать новую задачу."""
-    db_task = models.Task(**task.model_dump(), user_id=user_id)
-    db.add(db_task)
+# Больше id за один пакетный запрос не принимаем
+BATCH_MAX_IDS = 100
+
+
+def get_tasks_by_ids(db: Session, user_id: str, ids: List[int]) -> Tuple[list, List[int]]:
+    """
+    Задачи пользователя по списку id одним запросом.
+
+    В Postgres — id = ANY(:ids) с массивом в одном параметре (план не зависит
+    от числа id), в SQLite — IN (...).
+
+    Returns:
+        (строки с TASK_COLUMNS в порядке ids, id, которых нет или которые чужие)
+    """
+    if len(ids) > BATCH_MAX_IDS:
+        raise ValidationError(f"Не больше {BATCH_MAX_IDS} id за запрос")
+    if not ids:
+        return [], []
+    
+    if _is_postgres(db):
+        id_condition = models.Task.id == any_(bindparam("ids", list(ids), type_=ARRAY(Integer)))
+    else:
+        id_condition = models.Task.id.in_(ids)
+    rows = db.execute(
+        select(*TASK_COLUMNS).where(id_condition, models.Task.user_id == user_id)
+    ).all()
+    
+    by_id = {row.id: row for row in rows}
+    return [by_id[i] for i in ids if i in by_id], [i for i in ids if i not in by_id]
+
+
+def _metadata_facets(task: models.Task) -> Tuple[bool, Optional[str], List[str]]:
+    """Поля задачи, от которых зависят сводки категорий и тегов."""
+    return bool(task.status), task.category, list(task.tags or [])
+
+
+def _metadata_upsert(db: Session, model, user_id: str, name: str, active: int, completed: int):
+    """INSERT ... ON CONFLICT DO UPDATE: прибавить дельты к счётчикам сводки."""
+    insert = pg_insert if _is_postgres(db) else sqlite_insert
+    stmt = insert(model).values(
+        user_id=user_id, name=name, active_count=active, completed_count=completed
+    )
+    return stmt.on_conflict_do_update(
+        index_elements=[model.user_id, model.name],
+        set_={
+            "active_count": model.active_count + stmt.excluded.active_count,
+            "completed_count": model.completed_count + stmt.excluded.completed_count,
+        },
+    )
+
+
+def _adjust_metadata(db: Session, user_id: str, old=None, new=None):
+    """
+    Обновить сводки категорий и тегов при изменении задачи.
+
+    old/new — результат _metadata_facets до и после записи (None для
+    создания и удаления). Вызывается в той же транзакции, что и запись.
+    """
+    _adjust_metadata_many(db, user_id, [(old, new)])
+
+
+def _adjust_metadata_many(db: Session, user_id: str, changes: list):
+    """
+    Обновить сводки категорий и тегов по списку изменений задач (old, new).
+
+    Дельты суммируются, поэтому на каждое имя — один upsert, сколько бы
+    задач его ни затронуло. Элементы, у которых не осталось задач, удаляются.
+    """
+    deltas = {}
+    for old, new in changes:
+        for facets, sign in ((old, -1), (new, 1)):
+            if facets is None:
+                continue
+            status, category, tags = facets
+            slot = 1 if status else 0
+            names = [(models.UserTag, tag) for tag in set(tags) if tag]
+            if category:
+                names.append((models.UserCategory, category))
+            for key in names:
+                deltas.setdefault(key, [0, 0])[slot] += sign
+    
+    emptied = {}
+    for (model, name), (active, completed) in deltas.items():
+        if not active and not completed:
+            continue
+        db.execute(_metadata_upsert(db, model, user_id, name, active, completed))
+        if active < 0 or completed < 0:
+            emptied.setdefault(model, []).append(name)
+    
+    for model, names in emptied.items():
+        db.query(model).filter(
+            model.user_id == user_id,
+            model.name.in_(names),
+            model.active_count + model.completed_count <= 0
+        ).delete(synchronize_session=False)
+
+
+def get_data_version(db: Session, user_id: str) -> int:
+    """Текущая версия данных пользователя (0, пока он ничего не записывал)."""
+    return db.execute(
+        select(models.UserDataVersion.version).where(models.UserDataVersion.user_id == user_id)
+    ).scalar() or 0
+
+
+def _bump_data_version(db: Session, user_id: str) -> int:
+    """
+    Увеличить версию данных пользователя в той же транзакции, что и запись.
+
+    Строка версии блокируется до конца транзакции, поэтому записи одного
+    пользователя фиксируются в порядке своих версий.
+
+    Returns:
+        Новая версия (её получает changed_version изменённой задачи).
+    """
+    insert = pg_insert if _is_postgres(db) else sqlite_insert
+    stmt = insert(models.UserDataVersion).values(user_id=user_id, version=1)
+    return db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.UserDataVersion.user_id],
+        set_={"version": models.UserDataVersion.version + 1},
+    ).returning(models.UserDataVersion.version)).scalar_one()
+
+
+def _bump_daily_stats(db: Session, user_id: str, created: int = 0, completed: int = 0, reopened: int = 0):
+    """
+    Прибавить события к дневной сводке пользователя за сегодня (UTC).
+
+    INSERT ... ON CONFLICT DO UPDATE в той же транзакции, что и запись задачи.
+    """
+    if not (created or completed or reopened):
+        return
+    insert = pg_insert if _is_postgres(db) else sqlite_insert
+    stmt = insert(models.TaskDailyStat).values(
+        user_id=user_id, day=datetime.utcnow().date(),
+        created=created, completed=completed, reopened=reopened
+    )
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.TaskDailyStat.user_id, models.TaskDailyStat.day],
+        set_={
+            name: getattr(models.TaskDailyStat, name) + getattr(stmt.excluded, name)
+            for name in ("created", "completed", "reopened")
+        },
+    ))
+
+
+def _write_failure(db: Session, task_id: int, user_id: str, expected_version: Optional[int]):
+    """
+    Ошибка для условной записи, не затронувшей ни одной строки: задачи нет
+    (404) или её версия уже не expected_version (412). Транзакция откатывается.
+    """
+    exists = expected_version is not None and db.execute(
+        select(models.Task.id).where(models.Task.id == task_id, models.Task.user_id == user_id)
+    ).first() is not None
+    db.rollback()
+    return VersionConflictError() if exists else TaskNotFoundError(task_id)
+
+
+def _update_returning(
+    db: Session, task_id: int, user_id: str, values: dict, expected_version: Optional[int] = None
+):
+    """
+    UPDATE задачи одним запросом: RETURNING отдаёт новую строку (TASK_COLUMNS)
+    и поля сводок до записи. None, если задачи нет или (при expected_version)
+    её версия другая — rowcount = 0. Версия строки увеличивается на 1.
+
+    В Postgres прежние значения берутся из той же таблицы в FROM (она читается
+    по снимку до UPDATE). В SQLite RETURNING не видит других таблиц, поэтому
+    там они читаются отдельным SELECT — это только тестовая база.
+
+    Returns:
+        (строка задачи, _metadata_facets до записи) или None
+    """
+    table = models.Task.__table__
+    where = [table.c.id == task_id, table.c.user_id == user_id]
+    if expected_version is not None:
+        where.append(table.c.version == expected_version)
+    values = {**values, "version": table.c.version + 1}
+    facets = [table.c.status, table.c.category, table.c.tags]
+    if _is_postgres(db):
+        old = select(table.c.id, *facets).where(*where).subquery("old")
+        row = db.execute(
+            table.update().where(table.c.id == old.c.id).values(values)
+            .returning(*TASK_COLUMNS, *[old.c[c.name].label(f"old_{c.name}") for c in facets])
+        ).first()
+        if row is None:
+            return None
+        return row, _values_facets({"status": row.old_status, "category": row.old_category, "tags": row.old_tags})
+    
+    old = db.execute(select(*facets).where(*where)).first()
+    if old is None:
+        return None
+    row = db.execute(table.update().where(*where).values(values).returning(*TASK_COLUMNS)).first()
+    return row, _values_facets(old._mapping)
+
+
+def create_task(db: Session, task: schemas.TaskCreate, user_id: str):
+    """
+    Создать новую задачу.
+
+    Один INSERT ... RETURNING; задача без позиции встаёт в конец списка
+    (позиция считается подзапросом в том же INSERT).
+    """
+    values = _task_values(task.model_dump())
+    if values["position"] is None:
+        values["position"] = select(
+            func.coalesce(func.max(models.Task.position), 0) + POSITION_GAP
+        ).where(models.Task.user_id == user_id).scalar_subquery()
+    values.update(user_id=user_id, changed_version=_bump_data_version(db, user_id))
+    row = db.execute(models.Task.__table__.insert().values(values).returning(*TASK_COLUMNS)).first()
+    
+    _adjust_metadata(db, user_id, new=_values_facets(row._mapping))
+    _bump_daily_stats(db, user_id, created=1, completed=int(bool(row.status)))
     db.commit()
-    db.refresh(db_task)
-    return db_task
+    cache.invalidate(user_id)
+    return row
 
 
-def update_task(db: Session, task_id: int, task: schemas.TaskUpdate, user_id: str) -> models.Task:
-    """Обновить задачу."""
-    db_task = get_task_by_id(db, task_id, user_id)
+def update_task(
+    db: Session, task_id: int, task: schemas.TaskUpdate, user_id: str, expected_version: Optional[int] = None
+):
+    """
+    Обновить задачу одним UPDATE ... RETURNING (см. _update_returning).
+
+    Версия данных увеличивается до UPDATE: строка версии блокирует другие
+    записи пользователя, так что прежние значения для сводок актуальны.
+    expected_version (из If-Match) проверяется в том же UPDATE: если задачу
+    уже изменили, ничего не пишется (VersionConflictError).
+    """
+    values = _task_values(task.model_dump(exclude_unset=True))
+    values["changed_version"] = _bump_data_version(db, user_id)
+    result = _update_returning(db, task_id, user_id, values, expected_version)
+    if result is None:
+        raise _write_failure(db, task_id, user_id, expected_version)
+    row, old_facets = result
     
-    for key, value in task.model_dump(exclude_unset=True).items():
-        setattr(db_task, key, value)
+    new_facets = _values_facets(row._mapping)
+    _adjust_metadata(db, user_id, old=old_facets, new=new_facets)
     
+    # Смена статуса попадает в дневную сводку
+    if new_facets[0] != old_facets[0]:
+        _bump_daily_stats(db, user_id, completed=int(new_facets[0]), reopened=int(not new_facets[0]))
     db.commit()
-    db.refresh(db_task)
-    return db_task
+    cache.invalidate(user_id)
+    return row
+
 
+def delete_task(db: Session, task_id: int, user_id: str, expected_version: Optional[int] = None):
+    """
+    Удалить задачу одним DELETE ... RETURNING (поля для сводок).
 
-def delete_task(db: Session, task_id: int, user_id: str):
-    """Удалить задачу."""
-    db_task = get_task_by_id(db, task_id, user_id)
-    db.delete(db_task)
+    При expected_version (из If-Match) удаляет, только если задачу с тех пор
+    не меняли, иначе VersionConflictError.
+    """
+    table = models.Task.__table__
+    version = _bump_data_version(db, user_id)
+    where = [table.c.id == task_id, table.c.user_id == user_id]
+    if expected_version is not None:
+        where.append(table.c.version == expected_version)
+    row = db.execute(
+        table.delete().where(*where).returning(table.c.status, table.c.category, table.c.tags)
+    ).first()
+    if row is None:
+        raise _write_failure(db, task_id, user_id, expected_version)
+    
+    _adjust_metadata(db, user_id, old=_values_facets(row._mapping))
+    # Надгробие сообщит клиентам синхронизации (get_changes) об удалении
+    _write_tombstones(db, user_id, [task_id], version)
     db.commit()
+    cache.invalidate(user_id)
+
 
+# Позиции ручного порядка разрежены: новая задача встаёт на POSITION_GAP ниже
+# последней, перемещённая — посередине между соседями, так что перемещение —
+# запись одной строки. Когда зазор у соседей становится меньше
+# POSITION_MIN_GAP, позиции пользователя перенумеровываются (rebalance_positions).
+POSITION_GAP = 1 << 24
+POSITION_MIN_GAP = 1 << 8
 
-def get_categories(db: Session, user_id: str) -> List[str]:
-    """Получить список всех категорий пользователя."""
-    tasks = db.query(models.Task).filter(
+
+def _append_positions(db: Session, user_id: str, count: int) -> List[int]:
+    """Позиции для count новых задач в конце списка пользователя."""
+    if not count:
+        return []
+    last = db.execute(
+        select(func.max(models.Task.position)).where(models.Task.user_id == user_id)
+    ).scalar() or 0
+    return [last + POSITION_GAP * (i + 1) for i in range(count)]
+
+
+def _neighbour_position(db: Session, user_id: str, task_id: int, anchor, below: bool) -> Optional[int]:
+    """
+    Позиция ближайшей к anchor задачи снизу (below) или сверху, кроме
+    перемещаемой; None, если anchor — крайняя. Задача с той же позицией,
+    что у anchor, тоже считается соседом: места между ними нет.
+    """
+    position = models.Task.position
+    query = select(position).where(
         models.Task.user_id == user_id,
-        models.Task.category.isnot(None)
+        models.Task.id.notin_([task_id, anchor.id]),
+        position >= anchor.position if below else position <= anchor.position,
+    )
+    return db.execute(query.order_by(position.asc() if below else position.desc()).limit(1)).scalar()
+
+
+def _move_bounds(
+    db: Session, user_id: str, task_id: int, after_id: Optional[int], before_id: Optional[int]
+) -> Tuple[Optional[int], Optional[int]]:
+    """Позиции соседей сверху и снизу от нового места задачи (None — края списка)."""
+    anchors = {row.id: row for row in db.execute(
+        select(models.Task.id, models.Task.position).where(
+            models.Task.user_id == user_id, models.Task.id.in_([after_id, before_id])
+        )
+    )}
+    for anchor_id in (after_id, before_id):
+        if anchor_id is not None and anchor_id not in anchors:
+            raise TaskNotFoundError(anchor_id)
+    
+    after, before = anchors.get(after_id), anchors.get(before_id)
+    lower = after.position if after else _neighbour_position(db, user_id, task_id, before, below=False)
+    upper = before.position if before else _neighbour_position(db, user_id, task_id, after, below=True)
+    if lower is not None and upper is not None and lower > upper:
+        raise ValidationError("Задача after_id должна стоять выше before_id")
+    return lower, upper
+
+
+def _position_between(lower: Optional[int], upper: Optional[int]) -> Optional[int]:
+    """Позиция строго между соседями или None, если целых чисел между ними нет."""
+    if upper is None:
+        return (lower or 0) + POSITION_GAP
+    lower = -1 if lower is None else lower
+    if upper - lower < 2:
+        return None
+    return (lower + upper) // 2
+
+
+def _renumber_positions(db: Session, user_id: str, version: int):
+    """Перенумеровать позиции пользователя с шагом POSITION_GAP, сохранив порядок."""
+    table = models.Task.__table__
+    ranked = select(
+        table.c.id,
+        func.row_number().over(order_by=_order_by(SORT_KEYS["position"])).label("rank"),
+    ).where(table.c.user_id == user_id).subquery()
+    db.execute(
+        table.update()
+        .where(table.c.id == ranked.c.id, table.c.position.is_distinct_from(ranked.c.rank * POSITION_GAP))
+        # Порядок — не правка задачи пользователем: updated_at не трогаем
+        .values(
+            position=ranked.c.rank * POSITION_GAP,
+            changed_version=version,
+            version=table.c.version + 1,
+            updated_at=table.c.updated_at,
+        )
+    )
+
+
+def move_task(
+    db: Session,
+    task_id: int,
+    user_id: str,
+    after_id: Optional[int] = None,
+    before_id: Optional[int] = None
+) -> Tuple[Any, bool]:
+    """
+    Переместить задачу в ручном порядке между after_id (сверху) и before_id (снизу).
+
+    Достаточно одного соседа: второй находится по позициям. Новая позиция —
+    середина между соседями, это UPDATE одной строки; только если места
+    между ними не осталось, позиции пользователя перенумеровываются в той же
+    транзакции.
+
+    Returns:
+        (задача, нужна ли перенумерация в фоне: зазор у соседей стал мал)
+    """
+    if after_id is None and before_id is None:
+        raise ValidationError("Укажите after_id или before_id")
+    if task_id in (after_id, before_id):
+        raise ValidationError("Задачу нельзя поставить рядом с самой собой")
+    
+    # Версия блокирует запись других изменений пользователя до конца транзакции,
+    # так что соседи не сдвинутся между чтением позиций и записью
+    version = _bump_data_version(db, user_id)
+    lower, upper = _move_bounds(db, user_id, task_id, after_id, before_id)
+    position = _position_between(lower, upper)
+    if position is None:
+        _renumber_positions(db, user_id, version)
+        lower, upper = _move_bounds(db, user_id, task_id, after_id, before_id)
+        position = _position_between(lower, upper)
+    
+    table = models.Task.__table__
+    row = db.execute(
+        table.update().where(table.c.id == task_id, table.c.user_id == user_id)
+        .values(position=position, changed_version=version, version=table.c.version + 1)
+        .returning(*TASK_COLUMNS)
+    ).first()
+    if row is None:
+        db.rollback()
+        raise TaskNotFoundError(task_id)
+    db.commit()
+    cache.invalidate(user_id)
+    
+    gap_above = position - lower if lower is not None else position
+    gap_below = upper - position if upper is not None else POSITION_GAP
+    return row, min(gap_above, gap_below) < POSITION_MIN_GAP
+
+
+def rebalance_positions(db: Session, user_id: str):
+    """Перенумеровать позиции пользователя (после серии перемещений в одно место)."""
+    _renumber_positions(db, user_id, _bump_data_version(db, user_id))
+    db.commit()
+    cache.invalidate(user_id)
+
+
+def _metadata_rows(db: Session, model, user_id: str) -> list:
+    """Строки (name, active_count, completed_count) сводки пользователя по имени."""
+    return db.execute(
+        select(model.name, model.active_count, model.completed_count)
+        .where(model.user_id == user_id)
+        .order_by(model.name)
     ).all()
+
+
+def get_categories(db: Session, user_id: str) -> list:
+    """Категории пользователя со счётчиками активных и выполненных задач."""
+    return _metadata_rows(db, models.UserCategory, user_id)
+
+
+def get_all_tags(db: Session, user_id: str) -> list:
+    """Теги пользователя со счётчиками активных и выполненных задач."""
+    return _metadata_rows(db, models.UserTag, user_id)
+
+
+def _local_now(tz: Optional[str] = None) -> datetime:
+    """
+    Текущее время в часовом поясе клиента, без tzinfo.
+
+    date_time хранится так, как его ввёл клиент (локальное время без пояса),
+    поэтому границы «сегодня» и «просрочено» считаются в том же времени.
+    Без tz используется UTC.
+    """
+    if not tz:
+        return datetime.utcnow()
+    try:
+        zone = ZoneInfo(tz)
+    except (ZoneInfoNotFoundError, ValueError):
+        raise ValidationError(f"Неизвестный часовой пояс: {tz}")
+    return datetime.now(zone).replace(tzinfo=None)
+
+
+def get_task_stats(db: Session, user_id: str, tz: Optional[str] = None) -> dict:
+    """
+    Счётчики дашборда одним агрегатом COUNT(*) FILTER по задачам пользователя.
+
+    Результат кэшируется для текущей версии данных пользователя, но не дольше
+    ближайшей границы, после которой счётчики меняются сами: конца суток
+    («сегодня») или срока ближайшей открытой задачи («просрочено»).
+    """
+    now = _local_now(tz)
+    cache_key = ("stats", tz or "UTC", get_data_version(db, user_id))
+    stats = cache.get(user_id, cache_key)
+    if stats is not None:
+        return stats
+    
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    day_end = day_start + timedelta(days=1)
+    done = models.Task.status.is_(True)
+    active = models.Task.status.isnot(True)
+    date_time = models.Task.date_time
     
-    categories = set()
-    for task in tasks:
-        if task.category:
-            categories.add(task.category)
+    row = db.execute(
+        select(
+            func.count().label("total"),
+            func.count().filter(done).label("completed"),
+            func.count().filter(active).label("active"),
+            *[
+                func.count().filter(and_(active, models.Task.priority_rank == rank)).label(f"{name}_priority")
+                for name, rank in models.PRIORITY_RANKS.items()
+            ],
+            func.count().filter(and_(date_time >= day_start, date_time < day_end)).label("today"),
+            func.count().filter(and_(active, date_time < now)).label("overdue"),
+            func.min(date_time).filter(and_(active, date_time > now)).label("next_due"),
+        ).where(models.Task.user_id == user_id)
+    ).one()
     
-    return sorted(list(categories))
+    stats = dict(row._mapping)
+    next_due = stats.pop("next_due")
+    expires_at = min(next_due, day_end) if next_due else day_end
+    cache.set(user_id, cache_key, stats, ttl=(expires_at - now).total_seconds())
+    return stats
 
 
-def get_all_tags(db: Session, user_id: str) -> List[str]:
-    """Получить список всех тегов пользователя."""
-    tasks = db.query(models.Task).filter(
-        models.Task.user_id == user_id
+# Самый длинный период истории за один запрос (дней)
+DAILY_STATS_MAX_DAYS = 366
+
+
+def get_daily_stats(db: Session, user_id: str, date_from: date, date_to: date) -> List[dict]:
+    """
+    История по дням из task_daily_stats, включая дни без событий (с нулями).
+
+    Читает сводку напрямую — один range scan по первичному ключу.
+    """
+    if date_to < date_from:
+        raise ValidationError("Начало периода позже конца")
+    if (date_to - date_from).days >= DAILY_STATS_MAX_DAYS:
+        raise ValidationError(f"Период не может быть длиннее {DAILY_STATS_MAX_DAYS} дней")
+    
+    stat = models.TaskDailyStat
+    rows = db.execute(
+        select(stat.day, stat.created, stat.completed, stat.reopened)
+        .where(stat.user_id == user_id, stat.day >= date_from, stat.day <= date_to)
+        .order_by(stat.day)
+    ).all()
+    by_day = {row.day: row for row in rows}
+    
+    history = []
+    for offset in range((date_to - date_from).days + 1):
+        day = date_from + timedelta(days=offset)
+        row = by_day.get(day)
+        history.append({
+            "day": day,
+            "created": row.created if row else 0,
+            "completed": row.completed if row else 0,
+            "reopened": row.reopened if row else 0,
+        })
+    return history
+
+
+def backfill_daily_stats(db: Session, user_id: Optional[str] = None) -> int:
+    """
+    Пересчитать task_daily_stats по существующим задачам (разовая операция).
+
+    created считается по дате created_at, completed — по дате updated_at
+    выполненных задач (точное время выполнения не хранится). reopened из
+    текущих данных не восстановить, он остаётся нулевым. Существующие
+    строки сводки (всех пользователей или только user_id) заменяются.
+
+    Returns:
+        Количество записанных строк сводки.
+    """
+    task = models.Task
+    scope = [task.user_id == user_id] if user_id else []
+    counts = {}
+    for column, field, extra in (
+        (task.created_at, "created", []),
+        (task.updated_at, "completed", [task.status.is_(True)]),
+    ):
+        day = func.date(column, type_=Date)
+        rows = db.execute(
+            select(task.user_id, day.label("day"), func.count().label("count"))
+            .where(column.isnot(None), task.user_id.isnot(None), *scope, *extra)
+            .group_by(task.user_id, day)
+        ).all()
+        for row in rows:
+            counts.setdefault((row.user_id, row.day), {"created": 0, "completed": 0})[field] = row.count
+    
+    query = db.query(models.TaskDailyStat)
+    if user_id:
+        query = query.filter(models.TaskDailyStat.user_id == user_id)
+    query.delete(synchronize_session=False)
+    if counts:
+        db.execute(models.TaskDailyStat.__table__.insert(), [
+            {"user_id": uid, "day": day, "reopened": 0, **values}
+            for (uid, day), values in counts.items()
+        ])
+    db.commit()
+    return len(counts)
+
+
+# Больше изменений за одну синхронизацию не отдаём: клиенту дешевле загрузить список заново
+CHANGES_LIMIT = 1000
+
+
+def get_changes(db: Session, user_id: str, since: int) -> dict:
+    """
+    Изменения задач пользователя после версии since.
+
+    since=0 — полная синхронизация: все задачи, включая созданные до
+    миграции 015 (changed_version=0) и до первой записи пользователя.
+
+    Returns:
+        {"token": текущая версия, "upserts": созданные и изменённые задачи
+        (строки с TASK_COLUMNS), "deleted": id удалённых задач}
+
+    Raises:
+        SyncTokenExpiredError: надгробия после since уже удалены компакцией
+        или изменений больше CHANGES_LIMIT.
+    """
+    state = db.execute(
+        select(models.UserDataVersion.version, models.UserDataVersion.tombstone_horizon)
+        .where(models.UserDataVersion.user_id == user_id)
+    ).first()
+    version, horizon = state if state else (0, 0)
+    if since and since < horizon:
+        raise SyncTokenExpiredError()
+    
+    # Верхняя граница — версия, прочитанная первой: записи, зафиксированные
+    # во время синхронизации, попадут в следующую
+    conditions = [models.Task.user_id == user_id, models.Task.changed_version <= version]
+    if since:
+        conditions.append(models.Task.changed_version > since)
+    upserts = db.execute(
+        select(*TASK_COLUMNS)
+        .where(*conditions)
+        .order_by(models.Task.changed_version, models.Task.id)
+        .limit(CHANGES_LIMIT + 1)
     ).all()
+    if len(upserts) > CHANGES_LIMIT:
+        raise SyncTokenExpiredError("Изменений слишком много, загрузите задачи заново")
     
-    tags = set()
-    for task in tasks:
-        if task.tags:
-            tags.update(task.tags)
+    # При полной синхронизации у клиента ещё нет задач — удалять нечего
+    if not since:
+        return {"token": version, "upserts": upserts, "deleted": []}
     
-    return sorted(list(tags))
+    deleted = db.execute(
+        select(models.TaskTombstone.task_id)
+        .where(
+            models.TaskTombstone.user_id == user_id,
+            models.TaskTombstone.deleted_version > since,
+            models.TaskTombstone.deleted_version <= version,
+        )
+        .order_by(models.TaskTombstone.deleted_version)
+    ).scalars().all()
+    
+    return {"token": max(version, since), "upserts": upserts, "deleted": deleted}
+
+
+def compact_tombstones(db: Session, older_than_days: int = 30) -> int:
+    """
+    Удалить надгробия старше older_than_days дней.
+
+    Для каждого затронутого пользователя запоминает горизонт — последнюю
+    удалённую версию: синхронизация с более раннего токена получит 410.
+
+    Returns:
+        Количество удалённых надгробий.
+    """
+    cutoff = datetime.utcnow() - timedelta(days=older_than_days)
+    stale = models.TaskTombstone.deleted_at < cutoff
+    horizons = db.execute(
+        select(models.TaskTombstone.user_id, func.max(models.TaskTombstone.deleted_version))
+        .where(stale)
+        .group_by(models.TaskTombstone.user_id)
+    ).all()
+    for user_id, horizon in horizons:
+        db.query(models.UserDataVersion).filter(
+            models.UserDataVersion.user_id == user_id,
+            models.UserDataVersion.tombstone_horizon < horizon
+        ).update({"tombstone_horizon": horizon}, synchronize_session=False)
+    
+    removed = db.query(models.TaskTombstone).filter(stale).delete(synchronize_session=False)
+    db.commit()
+    return removed
+
+
+# Изменяемые колонки задачи: пакетный UPDATE пишет их целиком
+TASK_MUTABLE_FIELDS = (
+    "title", "description", "date_time", "priority_rank", "status", "position", "category", "tags",
+)
+
+# Больше операций за один пакет не принимаем
+BULK_MAX_OPERATIONS = 200
+
+
+def _task_values(data: dict) -> dict:
+    """Поля схемы задачи -> значения колонок (priority -> priority_rank)."""
+    values = dict(data)
+    if "priority" in values:
+        values["priority_rank"] = models.PRIORITY_RANKS[values.pop("priority") or "normal"]
+    return values
+
+
+def _values_facets(values: dict) -> Tuple[bool, Optional[str], List[str]]:
+    """_metadata_facets для значений колонок задачи."""
+    return bool(values.get("status")), values.get("category"), list(values.get("tags") or [])
+
+
+def _bulk_update_tasks(db: Session, user_id: str, rows: List[dict]):
+    """
+    Записать задачи пакетом: rows — {"id": ..., колонка: значение, ...}.
+
+    В Postgres — один UPDATE tasks ... FROM (VALUES ...) (значения приводятся
+    к типам колонок: в VALUES без явных типов NULL и JSON приходят как text),
+    в SQLite — executemany одного UPDATE.
+    """
+    table = models.Task.__table__
+    fields = [name for name in rows[0] if name != "id"]
+    if _is_postgres(db):
+        data = values(
+            column("id", Integer), *[column(name, table.c[name].type) for name in fields], name="v"
+        ).data([tuple(row[name] for name in ("id", *fields)) for row in rows])
+        db.execute(
+            table.update()
+            .where(table.c.id == data.c.id, table.c.user_id == user_id)
+            .values({
+                **{name: cast(data.c[name], table.c[name].type) for name in fields},
+                "version": table.c.version + 1,
+            })
+        )
+    else:
+        db.execute(
+            table.update()
+            .where(table.c.id == bindparam("b_id"), table.c.user_id == user_id)
+            .values({**{name: bindparam(f"b_{name}") for name in fields}, "version": table.c.version + 1}),
+            [{f"b_{name}": value for name, value in row.items()} for row in rows]
+        )
+
+
+def _write_tombstones(db: Session, user_id: str, task_ids, version: int):
+    """Надгробия удалённых задач одним INSERT ... ON CONFLICT DO UPDATE."""
+    now = datetime.utcnow()
+    insert = pg_insert if _is_postgres(db) else sqlite_insert
+    stmt = insert(models.TaskTombstone).values([
+        {"task_id": task_id, "user_id": user_id, "deleted_version": version, "deleted_at": now}
+        for task_id in task_ids
+    ])
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[models.TaskTombstone.task_id],
+        set_={"user_id": stmt.excluded.user_id, "deleted_version": stmt.excluded.deleted_version,
+              "deleted_at": stmt.excluded.deleted_at},
+    ))
+
+
+def bulk_apply(db: Session, user_id: str, operations: Sequence, atomic: bool = True) -> List[dict]:
+    """
+    Применить пакет операций create/update/delete в одной транзакции.
+
+    Операции выполняются по порядку над состоянием задач, прочитанным одним
+    SELECT ... FOR UPDATE; затем изменения записываются пакетно: один
+    INSERT ... RETURNING, один UPDATE ... FROM (VALUES ...), один DELETE,
+    а сводки, дневная статистика и версия данных — по одному разу на пакет.
+
+    atomic=True — при первой ошибке (задача не найдена) не применяется ничего
+    (TaskNotFoundError); atomic=False — ошибочные операции пропускаются.
+
+    Returns:
+        Результаты по операциям: {"index", "op", "ok", "id", "task", "error"}.
+    """
+    if len(operations) > BULK_MAX_OPERATIONS:
+        raise ValidationError(f"Не больше {BULK_MAX_OPERATIONS} операций за запрос")
+    
+    table = models.Task.__table__
+    ids = {operation.id for operation in operations if operation.op != "create"}
+    current = {}
+    if ids:
+        query = select(table.c.id, *[table.c[name] for name in TASK_MUTABLE_FIELDS]).where(
+            table.c.id.in_(ids), table.c.user_id == user_id
+        )
+        if _is_postgres(db):
+            query = query.with_for_update()
+        current = {row.id: dict(row._mapping) for row in db.execute(query)}
+    original = {task_id: _values_facets(task) for task_id, task in current.items()}
+    
+    results, creates, touched, deleted = [], [], set(), set()
+    for index, operation in enumerate(operations):
+        result = {"index": index, "op": operation.op, "ok": True, "id": getattr(operation, "id", None)}
+        results.append(result)
+        if operation.op == "create":
+            creates.append((result, _task_values(operation.data.model_dump())))
+            continue
+        if operation.id not in current:
+            error = TaskNotFoundError(operation.id)
+            if atomic:
+                raise error
+            result.update(ok=False, error=error.detail)
+            continue
+        if operation.op == "update":
+            current[operation.id].update(_task_values(operation.data.model_dump(exclude_unset=True)))
+            touched.add(operation.id)
+        else:
+            del current[operation.id]
+            touched.discard(operation.id)
+            deleted.add(operation.id)
+    
+    if not (creates or touched or deleted):
+        return results
+    
+    version = _bump_data_version(db, user_id)
+    now = datetime.utcnow()
+    
+    if creates:
+        appended = iter(_append_positions(db, user_id, sum(task["position"] is None for _, task in creates)))
+        for _, task in creates:
+            if task["position"] is None:
+                task["position"] = next(appended)
+        # Один многострочный INSERT ... VALUES: строки получают id из последовательности
+        # в порядке VALUES, поэтому отсортированные id совпадают с порядком операций
+        created_ids = sorted(db.execute(
+            table.insert()
+            .values([{**task, "user_id": user_id, "changed_version": version} for _, task in creates])
+            .returning(table.c.id)
+        ).scalars().all())
+        for (result, _), task_id in zip(creates, created_ids):
+            result["id"] = task_id
+    if touched:
+        _bulk_update_tasks(db, user_id, [
+            {"id": task_id, **{name: current[task_id][name] for name in TASK_MUTABLE_FIELDS},
+             "updated_at": now, "changed_version": version}
+            for task_id in touched
+        ])
+    if deleted:
+        db.execute(table.delete().where(table.c.id.in_(deleted), table.c.user_id == user_id))
+        _write_tombstones(db, user_id, deleted, version)
+    
+    flips = [current[task_id]["status"] for task_id in touched
+             if bool(current[task_id]["status"]) != original[task_id][0]]
+    _adjust_metadata_many(db, user_id, [
+        *[(None, _values_facets(task)) for _, task in creates],
+        *[(original[task_id], _values_facets(current[task_id])) for task_id in touched],
+        *[(original[task_id], None) for task_id in deleted],
+    ])
+    _bump_daily_stats(
+        db, user_id,
+        created=len(creates),
+        completed=sum(1 for status in flips if status),
+        reopened=sum(1 for status in flips if not status),
+    )
+    
+    # Итоговое состояние созданных и изменённых задач — одним запросом
+    written = [result["id"] for result in results if result["ok"] and result["op"] != "delete"]
+    tasks = {row.id: row for row in db.execute(
+        select(*TASK_COLUMNS).where(models.Task.id.in_(written), models.Task.user_id == user_id)
+    )} if written else {}
+    for result in results:
+        if result["ok"] and result["id"] in tasks:
+            result["task"] = tasks[result["id"]]
+    
+    db.commit()
+    cache.invalidate(user_id)
+    return results
+
+
+# Массовое изменение по фильтру по умолчанию затрагивает не больше стольких задач
+MASS_MAX_AFFECTED = 1000
+
+# Фильтры, которые сужают выборку (tag_mode и search_mode лишь уточняют их)
+MASS_FILTERS = ("status", "priority", "search", "category", "tags")
+
+
+def _require_filters(filters: dict, all_tasks: bool) -> None:
+    """Без фильтров массовое изменение касается всех задач — только по явному all_tasks."""
+    if not all_tasks and all(filters.get(name) in (None, "", []) for name in MASS_FILTERS):
+        raise ValidationError("Укажите хотя бы один фильтр или all=true, чтобы изменить все задачи")
+
+
+def _select_affected(db: Session, user_id: str, max_affected: int, filters: dict) -> list:
+    """
+    Задачи под фильтром (id и поля сводок) для массового изменения.
+
+    Вызывается после _bump_data_version: строка версии уже заблокирована,
+    поэтому другие записи пользователя не изменят набор задач до конца
+    транзакции, и UPDATE/DELETE по тому же фильтру затронет ровно эти строки.
+    Читается не больше max_affected + 1 строки: лишней достаточно для отказа.
+    """
+    rows = db.execute(
+        select(models.Task.id, models.Task.status, models.Task.category, models.Task.tags)
+        .where(*_filter_conditions(db, user_id, **filters))
+        .limit(max_affected + 1)
+    ).all()
+    if len(rows) > max_affected:
+        db.rollback()
+        raise ValidationError(f"Под фильтр попадает больше {max_affected} задач")
+    return rows
+
+
+def _count_affected(db: Session, user_id: str, filters: dict) -> int:
+    """Сколько задач попадает под фильтр (dry_run массовых изменений)."""
+    return db.execute(
+        select(func.count()).select_from(models.Task).where(*_filter_conditions(db, user_id, **filters))
+    ).scalar_one()
+
+
+def update_tasks_where(
+    db: Session,
+    user_id: str,
+    task: schemas.TaskUpdate,
+    dry_run: bool = False,
+    max_affected: int = MASS_MAX_AFFECTED,
+    all_tasks: bool = False,
+    **filters
+) -> int:
+    """
+    Изменить все задачи под фильтром (те же фильтры, что у get_tasks)
+    одним UPDATE ... WHERE.
+
+    Сводки, дневная статистика и версия данных обновляются по одному разу
+    на весь запрос. Если задач больше max_affected, ничего не меняется
+    (ValidationError). При dry_run только считает задачи под фильтром.
+    Без фильтров нужен all_tasks=True, иначе ValidationError.
+
+    Returns:
+        Количество изменённых (при dry_run — подходящих) задач.
+    """
+    _require_filters(filters, all_tasks)
+    changes = _task_values(task.model_dump(exclude_unset=True))
+    if not changes:
+        raise ValidationError("Не передано ни одного поля для изменения")
+    if dry_run:
+        return _count_affected(db, user_id, filters)
+    
+    version = _bump_data_version(db, user_id)
+    rows = _select_affected(db, user_id, max_affected, filters)
+    if not rows:
+        db.rollback()
+        return 0
+    
+    result = db.execute(
+        models.Task.__table__.update()
+        .where(*_filter_conditions(db, user_id, **filters))
+        .values(**changes, updated_at=datetime.utcnow(), changed_version=version, version=models.Task.version + 1)
+    )
+    
+    facets = [(_values_facets(row._mapping), _values_facets({**row._mapping, **changes})) for row in rows]
+    _adjust_metadata_many(db, user_id, facets)
+    flips = [new[0] for old, new in facets if old[0] != new[0]]
+    _bump_daily_stats(db, user_id, completed=sum(flips), reopened=len(flips) - sum(flips))
+    db.commit()
+    cache.invalidate(user_id)
+    return result.rowcount
+
+
+def delete_tasks_where(
+    db: Session,
+    user_id: str,
+    dry_run: bool = False,
+    max_affected: int = MASS_MAX_AFFECTED,
+    all_tasks: bool = False,
+    **filters
+) -> int:
+    """
+    Удалить все задачи под фильтром (те же фильтры, что у get_tasks)
+    одним DELETE ... WHERE; на каждую удалённую задачу пишется надгробие.
+
+    Если задач больше max_affected, ничего не удаляется (ValidationError).
+    При dry_run только считает задачи под фильтром. Без фильтров нужен
+    all_tasks=True, иначе ValidationError.
+
+    Returns:
+        Количество удалённых (при dry_run — подходящих) задач.
+    """
+    _require_filters(filters, all_tasks)
+    if dry_run:
+        return _count_affected(db, user_id, filters)
+    
+    version = _bump_data_version(db, user_id)
+    rows = _select_affected(db, user_id, max_affected, filters)
+    if not rows:
+        db.rollback()
+        return 0
+    
+    result = db.execute(
+        models.Task.__table__.delete().where(*_filter_conditions(db, user_id, **filters))
+    )
+    _write_tombstones(db, user_id, [row.id for row in rows], version)
+    _adjust_metadata_many(db, user_id, [(_values_facets(row._mapping), None) for row in rows])
+    db.commit()
+    cache.invalidate(user_id)
+    return result.rowcount
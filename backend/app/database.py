@@ -1,7 +1,8 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from fastapi import Request
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session, sessionmaker
 import os
+import time
 
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://postgres:postgres@db:5432/tasks")
 
@@ -14,5 +15,62 @@ engine = create_engine(
     pool_recycle=3600,  # Переиспользование соединений каждый час
     echo=False  # Отключаем вывод SQL запросов в production
 )
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-Base = declarative_base()
+
+class RequestSession(Session):
+    """
+    Сессия запроса: соединение берётся из пула при первом запросе к базе
+    и возвращается при commit/rollback/close. В info накапливается, сколько
+    ждали соединение (db_checkout) и сколько его держали (db_hold), в секундах.
+    """
+
+
+@event.listens_for(RequestSession, "after_transaction_create")
+def _checkout_started(session, transaction):
+    if transaction.parent is None:
+        session.info["db_checkout_started"] = time.perf_counter()
+
+
+@event.listens_for(RequestSession, "after_begin")
+def _checkout_done(session, transaction, connection):
+    started = session.info.pop("db_checkout_started", None)
+    if started is not None:
+        now = time.perf_counter()
+        session.info["db_checkout"] = session.info.get("db_checkout", 0.0) + now - started
+        session.info["db_acquired"] = now
+
+
+@event.listens_for(RequestSession, "after_transaction_end")
+def _connection_released(session, transaction):
+    if transaction.parent is None:
+        session.info.pop("db_checkout_started", None)
+        acquired = session.info.pop("db_acquired", None)
+        if acquired is not None:
+            session.info["db_hold"] = session.info.get("db_hold", 0.0) + time.perf_counter() - acquired
+
+
+SessionLocal = sessionmaker(class_=RequestSession, autocommit=False, autoflush=False, bind=engine)
+
+
+def session_dependency(session_factory):
+    """
+    Зависимость FastAPI с сессией из session_factory.
+
+    Подключается как Depends(get_db, scope="function"): тогда сессия
+    закрывается, как только тело ответа собрано, а не после его отправки
+    клиенту и прохода через middleware (сжатие, логирование). Времена
+    ожидания и удержания соединения попадают в request.state.db_timings.
+    """
+    def get_db(request: Request):
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+            request.state.db_timings = {
+                name: db.info[name] for name in ("db_checkout", "db_hold") if name in db.info
+            }
+    return get_db
+
+
+# Единственный источник сессии для роутов (tasks, auth, bootstrap)
+get_db = session_dependency(SessionLocal)
@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+ETag и условные запросы (If-None-Match -> 304 Not Modified, If-Match -> 412).
+
+ETag списков строится из версии данных пользователя (crud.get_data_version),
+пути и параметров запроса, поэтому сверить его можно до чтения задач.
+ETag одной задачи — версия её строки (tasks.version).
+"""
+import hashlib
+import re
+from typing import Iterable, Optional, Tuple
+
+from fastapi import Request, Response
+
+from .exceptions import NotModified, VersionConflictError
+
+
+def make_etag(user_id: str, version, path: str, params: Iterable[Tuple[str, str]] = ()) -> str:
+    """
+    Слабый ETag вида W/"<версия>-<хэш>".
+
+    Хэш учитывает пользователя, путь и параметры запроса (порядок параметров
+    не важен). Слабый — потому что тело может сжиматься (GZip).
+    """
+    digest = hashlib.sha1(user_id.encode())
+    digest.update(path.encode())
+    for key, value in sorted(params):
+        digest.update(f"\0{key}={value}".encode())
+    return f'W/"{version}-{digest.hexdigest()[:16]}"'
+
+
+def content_etag(user_id: str, path: str, params: Iterable[Tuple[str, str]], content: dict) -> str:
+    """
+    ETag по самим данным ответа — для ответов, которые меняются и со временем,
+    а не только при записи (например, счётчики «сегодня» и «просрочено»).
+    """
+    items = [*params, *((f"={key}", str(value)) for key, value in content.items())]
+    return make_etag(user_id, "c", path, items)
+
+
+def request_etag(request: Request, user_id: str, version) -> str:
+    """ETag для текущего запроса."""
+    return make_etag(user_id, version, request.url.path, request.query_params.multi_items())
+
+
+def _matches(header: str, etag: str) -> bool:
+    """Слабое сравнение If-None-Match со списком тегов или *."""
+    if header.strip() == "*":
+        return True
+    bare = etag.removeprefix("W/")
+    return any(tag.strip().removeprefix("W/") == bare for tag in header.split(","))
+
+
+def check_etag(request: Request, response: Response, etag: str) -> None:
+    """
+    Проставить ETag в ответ; если клиент прислал тот же тег в If-None-Match,
+    прервать запрос ответом 304.
+    """
+    header = request.headers.get("if-none-match")
+    if header and _matches(header, etag):
+        raise NotModified(etag)
+    response.headers["ETag"] = etag
+    # Браузер хранит ответ, но перед использованием всегда сверяет ETag
+    response.headers["Cache-Control"] = "private, no-cache"
+
+
+def task_etag(version: int) -> str:
+    """Сильный ETag задачи вида "<версия строки>" (годится для If-Match)."""
+    return f'"{version}"'
+
+
+def if_match_version(request: Request) -> Optional[int]:
+    """
+    Версия задачи из If-Match или None, если заголовка нет или он равен *.
+
+    Принимается один тег; тег, ослабленный прокси при сжатии (W/"3"),
+    сравнивается по той же версии. Нераспознанный тег не может совпасть
+    с текущей версией, поэтому сразу 412.
+    """
+    header = request.headers.get("if-match")
+    if header is None or header.strip() == "*":
+        return None
+    match = re.fullmatch(r'\s*(?:W/)?"(\d+)"\s*', header)
+    if match is None:
+        raise VersionConflictError()
+    return int(match.group(1))
@@ -54,3 +54,35 @@ class DatabaseError(VectoraException):
             detail=message,
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+class NotModified(HTTPException):
+    """
+    Ресурс не изменился с версии из If-None-Match (304 без тела).
+
+    Наследуется от HTTPException, а не от VectoraException: стандартный
+    обработчик отдаёт 304 без тела, а не JSON с detail.
+    """
+    def __init__(self, etag: str):
+        super().__init__(
+            status_code=status.HTTP_304_NOT_MODIFIED,
+            headers={"ETag": etag, "Cache-Control": "private, no-cache"}
+        )
+
+
+class SyncTokenExpiredError(VectoraException):
+    """Синхронизация с этого токена невозможна, нужна полная загрузка."""
+    def __init__(self, message: str = "Токен синхронизации устарел, загрузите задачи заново"):
+        super().__init__(
+            detail=message,
+            status_code=status.HTTP_410_GONE
+        )
+
+
+class VersionConflictError(VectoraException):
+    """Задача изменилась после версии из If-Match (412)."""
+    def __init__(self, message: str = "Задача уже изменена на другом устройстве, загрузите её заново"):
+        super().__init__(
+            detail=message,
+            status_code=status.HTTP_412_PRECONDITION_FAILED
+        )
@@ -1,11 +1,12 @@
 from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.responses import JSONResponse
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
-from app.routers import tasks, auth
+from app.routers import tasks, auth, bootstrap
 from app.settings import settings
 from app.exceptions import VectoraException
 from app.logging_config import logger
@@ -56,7 +57,19 @@ async def log_requests(request: Request, call_next):
     try:
         response = await call_next(request)
         process_time = time.time() - start_time
-        logger.info(f"Ответ: {response.status_code} за {process_time:.3f}s")
+        # Ожидание соединения из пула и его удержание (заполняет database.get_db)
+        db_timings = getattr(request.state, "db_timings", None)
+        if db_timings:
+            response.headers["Server-Timing"] = ", ".join(
+                f"{name};dur={seconds * 1000:.1f}" for name, seconds in db_timings.items()
+            )
+            logger.info(
+                f"Ответ: {response.status_code} за {process_time:.3f}s "
+                f"(БД: ожидание {db_timings.get('db_checkout', 0):.3f}s, "
+                f"удержание {db_timings.get('db_hold', 0):.3f}s)"
+            )
+        else:
+            logger.info(f"Ответ: {response.status_code} за {process_time:.3f}s")
         return response
     except Exception as e:
         process_time = time.time() - start_time
@@ -86,12 +99,15 @@ app.add_middleware(
     allow_origins=allow_origins,
     allow_origin_regex=settings.backend_cors_regex,
     allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],  # Только нужные методы
-    allow_headers=["Content-Type", "Authorization", "Accept"],  # Только нужные headers
-    expose_headers=["Content-Type"],
+    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],  # Только нужные методы
+    allow_headers=["Content-Type", "Authorization", "Accept", "If-None-Match", "If-Match"],  # Только нужные headers
+    expose_headers=["Content-Type", "X-Next-Cursor", "ETag", "X-Data-Version", "Server-Timing"],
     max_age=600,  # Кэш preflight запросов на 10 минут
 )
 
+# Сжатие ответов: списки задач и годовой обзор календаря — JSON в десятки КБ
+app.add_middleware(GZipMiddleware, minimum_size=1000)
+
 # Trusted Host Middleware - защита от Host header attacks
 if not settings.debug:
     app.add_middleware(
@@ -102,6 +118,7 @@ if not settings.debug:
 # Подключаем роутеры
 app.include_router(auth.router)
 app.include_router(tasks.router)
+app.include_router(bootstrap.router)
 
 
 @app.on_event("startup")
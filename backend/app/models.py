@@ -1,10 +1,18 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, JSON
+from sqlalchemy import Column, BigInteger, Integer, SmallInteger, String, Text, Date, DateTime, Boolean, ForeignKey, JSON, Index, case, text
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy.ext.hybrid import hybrid_property
 from sqlalchemy.orm import relationship
 from datetime import datetime
+from typing import Optional
 
 Base = declarative_base()
 
+# Приоритет задачи хранится порядковым числом: чем важнее, тем больше.
+# В API по-прежнему используются строки low/normal/high.
+PRIORITY_RANKS = {"low": 1, "normal": 2, "high": 3}
+PRIORITY_NAMES = {rank: name for name, rank in PRIORITY_RANKS.items()}
+
 
 class User(Base):
     """Модель пользователя с безопасным хранением паролей"""
@@ -30,22 +38,166 @@ class User(Base):
 
 class Task(Base):
     __tablename__ = "tasks"
+    # Все запросы к задачам начинаются с user_id = ?, поэтому индексы составные
+    # и ведутся по user_id, а хвост повторяет ORDER BY соответствующей сортировки
+    # (включая NULLS LAST), чтобы страница читалась из индекса без сортировки.
+    # Порядок NULLS LAST в индексе есть только в Postgres, поэтому индексы
+    # создаются только там (см. миграцию 006_composite_indexes).
     __table_args__ = (
+        Index(
+            "ix_tasks_user_position", "user_id", "position",
+            text("created_at DESC NULLS LAST"), text("id DESC"),
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_tasks_user_status_position", "user_id", "status", "position",
+            text("created_at DESC NULLS LAST"), text("id DESC"),
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_tasks_user_date_time", "user_id",
+            text("date_time DESC NULLS LAST"), text("id DESC"),
+        ).ddl_if(dialect="postgresql"),
+        Index(
+            "ix_tasks_user_priority_rank", "user_id",
+            text("priority_rank DESC"), "position", text("id DESC"),
+        ).ddl_if(dialect="postgresql"),
+        # Сортировка urgency: открытые задачи, важные раньше, затем по сроку
+        Index(
+            "ix_tasks_user_urgency", "user_id", "status",
+            text("priority_rank DESC"), "date_time", "id",
+        ).ddl_if(dialect="postgresql"),
+        Index("ix_tasks_user_title", "user_id", "title", "id").ddl_if(dialect="postgresql"),
+        Index("ix_tasks_user_category", "user_id", "category").ddl_if(dialect="postgresql"),
+        # Синхронизация изменений: задачи пользователя, изменённые после версии
+        Index("ix_tasks_user_changed_version", "user_id", "changed_version").ddl_if(dialect="postgresql"),
+        # jsonb_path_ops: компактный GIN-индекс под оператор @> (фильтр по тегам)
+        Index(
+            "ix_tasks_tags", "tags",
+            postgresql_using="gin", postgresql_ops={"tags": "jsonb_path_ops"},
+        ).ddl_if(dialect="postgresql"),
         {'extend_existing': True}
     )
     
-    id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), index=True, nullable=False)
-    title = Column(String, nullable=False, index=True)  # Индекс для быстрого поиска
+    id = Column(Integer, primary_key=True)
+    # В базе tasks.user_id — VARCHAR (001_create_tasks_table): id пользователя
+    # Telegram строкой. Тип в модели должен совпадать с базой: asyncpg (benchmarks/crud_async)
+    # передаёт параметры с явным приведением к типу колонки.
+    user_id = Column(String, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    title = Column(String, nullable=False)
     description = Column(Text)
-    date_time = Column(DateTime, index=True)  # Индекс для сортировки по дате
-    priority = Column(String, default="normal", index=True)  # Индекс для фильтрации
-    status = Column(Boolean, default=False, index=True)  # Индекс для фильтрации
-    position = Column(Integer, default=0)
-    category = Column(String, default=None, nullable=True, index=True)  # Индекс для фильтрации
-    tags = Column(JSON, default=list)
-    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    date_time = Column(DateTime)
+    priority_rank = Column(SmallInteger, nullable=False, default=PRIORITY_RANKS["normal"])
+    status = Column(Boolean, default=False)
+    # Разреженная позиция в ручном порядке (crud.POSITION_GAP между соседями)
+    position = Column(BigInteger, default=0)
+    category = Column(String, default=None, nullable=True)
+    tags = Column(JSON().with_variant(JSONB, "postgresql"), default=list)
+    created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Версия данных пользователя (UserDataVersion) на момент последней записи задачи
+    changed_version = Column(BigInteger, nullable=False, default=0)
+    # Версия строки: растёт при каждой записи задачи, отдаётся как ETag и
+    # сверяется с If-Match (оптимистичная блокировка, см. crud.update_task)
+    version = Column(Integer, nullable=False, default=1)
     
     # Связь с пользователем
     owner = relationship("User", back_populates="tasks")
+    
+    @hybrid_property
+    def priority(self) -> Optional[str]:
+        """Приоритет строкой (low/normal/high)."""
+        return PRIORITY_NAMES.get(self.priority_rank)
+    
+    @priority.setter
+    def priority(self, value: Optional[str]):
+        self.priority_rank = PRIORITY_RANKS[value or "normal"]
+    
+    @priority.expression
+    def priority(cls):
+        return case(PRIORITY_NAMES, value=cls.priority_rank)
+
+
+class UserCategory(Base):
+    """
+    Сводка по категориям пользователя: сколько активных и выполненных задач.
+
+    Поддерживается инкрементально в crud при каждой записи задачи, поэтому
+    список категорий — один range scan по первичному ключу.
+    """
+    __tablename__ = "user_categories"
+    __table_args__ = (
+        {'extend_existing': True}
+    )
+    
+    user_id = Column(String, primary_key=True)
+    name = Column(String, primary_key=True)
+    active_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+
+
+class UserTag(Base):
+    """Сводка по тегам пользователя (аналогично UserCategory)."""
+    __tablename__ = "user_tags"
+    __table_args__ = (
+        {'extend_existing': True}
+    )
+    
+    user_id = Column(String, primary_key=True)
+    name = Column(String, primary_key=True)
+    active_count = Column(Integer, nullable=False, default=0)
+    completed_count = Column(Integer, nullable=False, default=0)
+
+
+class TaskDailyStat(Base):
+    """
+    Дневная сводка событий пользователя: создано, выполнено и переоткрыто задач.
+
+    День — дата события по UTC. Ведётся инкрементально в crud при создании
+    задачи и смене её статуса; удаление задачи историю не меняет.
+    """
+    __tablename__ = "task_daily_stats"
+    __table_args__ = (
+        {'extend_existing': True}
+    )
+    
+    user_id = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True)
+    created = Column(Integer, nullable=False, default=0)
+    completed = Column(Integer, nullable=False, default=0)
+    reopened = Column(Integer, nullable=False, default=0)
+
+
+class UserDataVersion(Base):
+    """
+    Версия данных пользователя: растёт на единицу при каждой записи его задач.
+
+    Из неё строятся ETag ответов, поэтому проверка If-None-Match стоит
+    одного чтения по первичному ключу.
+    """
+    __tablename__ = "user_data_versions"
+    __table_args__ = (
+        {'extend_existing': True}
+    )
+    
+    user_id = Column(String, primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
+    # Надгробия удалённых задач до этой версии уже удалены при компакции:
+    # синхронизация с более старой версии невозможна
+    tombstone_horizon = Column(BigInteger, nullable=False, default=0)
+
+
+class TaskTombstone(Base):
+    """
+    След удалённой задачи для синхронизации изменений (GET /tasks/changes).
+
+    Хранится, пока его не удалит компакция (manage.py compact-tombstones).
+    """
+    __tablename__ = "task_tombstones"
+    __table_args__ = (
+        Index("ix_task_tombstones_user_version", "user_id", "deleted_version"),
+        {'extend_existing': True}
+    )
+    
+    task_id = Column(Integer, primary_key=True)
+    user_id = Column(String, nullable=False)
+    deleted_version = Column(BigInteger, nullable=False)
+    deleted_at = Column(DateTime, nullable=False, default=datetime.utcnow)
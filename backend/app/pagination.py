@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+"""
+Курсорная (keyset) пагинация.
+
+Курсор — непрозрачная для клиента строка: base64 от JSON с режимом
+сортировки и значениями ключа сортировки последней отданной строки.
+"""
+import base64
+import binascii
+import json
+import math
+from datetime import datetime
+from typing import Any, List, Sequence
+
+from app.exceptions import ValidationError
+
+
+def encode_cursor(sort_by: str, values: Sequence[Any]) -> str:
+    """Упаковать значения ключа сортировки в курсор."""
+    payload = {
+        "s": sort_by,
+        "k": [v.isoformat() if isinstance(v, datetime) else v for v in values],
+    }
+    raw = json.dumps(payload, separators=(",", ":"), ensure_ascii=False)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+# Целые ключи (id, position, priority_rank) — bigint в базе
+INT_RANGE = range(-2 ** 63, 2 ** 63)
+
+
+def _decode_value(value: Any, kind: type) -> Any:
+    """Значение ключа из JSON с проверкой типа; ValueError, если тип не тот."""
+    if value is None:
+        return None
+    if kind is datetime and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    # bool в Python — подкласс int, поэтому проверяем его отдельно
+    if kind is int and isinstance(value, int) and not isinstance(value, bool) and value in INT_RANGE:
+        return value
+    if kind is float and isinstance(value, (int, float)) and not isinstance(value, bool) and math.isfinite(value):
+        return float(value)
+    if kind in (bool, str) and isinstance(value, kind):
+        return value
+    raise ValueError(f"Ожидалось значение типа {kind.__name__}")
+
+
+def decode_cursor(cursor: str, sort_by: str, kinds: Sequence[type]) -> List[Any]:
+    """
+    Распаковать курсор.
+
+    Args:
+        cursor: строка, ранее выданная encode_cursor
+        sort_by: текущий режим сортировки (должен совпадать с режимом курсора)
+        kinds: ожидаемые типы значений ключа (datetime восстанавливается из ISO)
+
+    Raises:
+        ValidationError: если курсор повреждён, выдан для другой сортировки
+            или значения ключа не того типа (подделанный или устаревший курсор)
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        values = payload["k"]
+        if payload["s"] != sort_by or len(values) != len(kinds):
+            raise ValueError
+        return [_decode_value(v, kind) for v, kind in zip(values, kinds)]
+    except (ValueError, KeyError, TypeError, binascii.Error):
+        raise ValidationError("Некорректный курсор пагинации")
@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 from typing import Optional
 from datetime import datetime
 
-from ..database import SessionLocal
+from ..database import get_db
 from .. import models, schemas
 from ..security import (
     verify_password,
@@ -22,18 +22,9 @@ router = APIRouter(prefix="/auth", tags=["authentication"])
 security = HTTPBearer()
 
 
-def get_db():
-    """Dependency для получения сессии БД"""
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
-
-
 def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ) -> models.User:
     """
     Получение текущего пользователя из JWT токена
@@ -86,7 +77,7 @@ def get_current_active_user(
 @router.post("/register", response_model=schemas.UserOut, status_code=status.HTTP_201_CREATED)
 def register(
     user_data: schemas.UserCreate,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """
     Регистрация нового пользователя
@@ -128,7 +119,7 @@ def register(
 @router.post("/login", response_model=schemas.Token)
 def login(
     login_data: schemas.LoginRequest,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """
     Аутентификация пользователя и получение токенов
@@ -180,7 +171,7 @@ def login(
 @router.post("/refresh", response_model=schemas.Token)
 def refresh_tokens(
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """
     Обновление access token используя refresh token
@@ -233,7 +224,7 @@ def get_me(
 def update_me(
     user_update: schemas.UserUpdate,
     current_user: models.User = Depends(get_current_active_user),
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db, scope="function")
 ):
     """
     Обновление профиля текущего пользователя
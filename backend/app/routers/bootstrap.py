@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+"""
+Холодный старт Mini App: всё для первого экрана одним запросом.
+"""
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query, Request
+from sqlalchemy.orm import Session
+
+from app import crud, schemas, etag
+from app.auth import get_current_profile, get_current_user
+from app.database import get_db
+
+router = APIRouter(tags=["bootstrap"])
+
+
+@router.get("/bootstrap", response_model=schemas.BootstrapOut)
+def bootstrap(
+    request: Request,
+    limit: int = Query(100, ge=1, le=500, description="Размер первой страницы задач"),
+    sort_by: Optional[str] = Query(None, description="Сортировка первой страницы (как в GET /tasks/)"),
+    view: Optional[str] = Query(None, pattern="^(full|compact)$", description="Полные задачи или облегчённые"),
+    tz: Optional[str] = Query(None, description="Часовой пояс клиента для счётчиков (как в GET /tasks/stats)"),
+    db: Session = Depends(get_db, scope="function"),
+    profile: dict = Depends(get_current_profile),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Получить первую страницу задач, категории, теги, счётчики и профиль.
+
+    Всё читается в одной сессии БД после одной проверки initData.
+    Параметры limit, sort_by и view — как у GET /tasks/, tz — как у GET /tasks/stats.
+
+    etag каждого раздела совпадает с ETag соответствующего эндпоинта с теми же
+    параметрами, поэтому дальше их можно запрашивать с If-None-Match;
+    version — токен since для GET /tasks/changes.
+    """
+    version = crud.get_data_version(db, user_id)
+    params = request.query_params
+    
+    def section_etag(name: str, keys=()) -> str:
+        items = [(key, value) for key, value in params.multi_items() if key in keys]
+        return etag.make_etag(user_id, version, request.app.url_path_for(name), items)
+    
+    tasks, next_cursor = crud.get_tasks_page(
+        db, user_id, limit=limit, sort_by=sort_by or "position", view=view or "full"
+    )
+    stats = crud.get_task_stats(db, user_id, tz)
+    stats_params = [(key, value) for key, value in params.multi_items() if key == "tz"]
+    
+    return {
+        "profile": profile,
+        "version": version,
+        "tasks": {
+            "items": tasks,
+            "next_cursor": next_cursor,
+            "etag": section_etag("read_tasks", ("limit", "sort_by", "view")),
+        },
+        "categories": {
+            "items": crud.get_categories(db, user_id),
+            "etag": section_etag("get_categories"),
+        },
+        "tags": {
+            "items": crud.get_all_tags(db, user_id),
+            "etag": section_etag("get_tags"),
+        },
+        "stats": {
+            "counters": stats,
+            "etag": etag.content_etag(user_id, request.app.url_path_for("read_task_stats"), stats_params, stats),
+        },
+    }
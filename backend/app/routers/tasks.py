@@ -1,114 +1,448 @@
 
-from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Query, Request, Response
 from sqlalchemy.orm import Session
-from app import crud, schemas, database
+from app import crud, schemas, etag
+from app.database import get_db
 from app.auth import get_current_user
-from typing import List, Optional
+from app.exceptions import ValidationError
+from typing import List, Optional, Union
+from datetime import date, datetime, timedelta
 
 router = APIRouter(prefix="/tasks", tags=["tasks"])
 
-def get_db():
-    db = database.SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
 
+def conditional_get(
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    ETag по версии данных пользователя и параметрам запроса.
 
-@router.get("/", response_model=List[schemas.TaskOut])
-def read_tasks(
-    skip: int = Query(0, ge=0, description="Пропустить N записей"),
-    limit: int = Query(100, ge=1, le=500, description="Лимит записей"),
+    Если If-None-Match совпадает, отвечаем 304 ещё до чтения задач.
+    Версия отдаётся и в X-Data-Version: это токен since для GET /tasks/changes
+    (версия читается до задач, поэтому синхронизация с неё ничего не пропустит).
+    """
+    version = crud.get_data_version(db, user_id)
+    etag.check_etag(request, response, etag.request_etag(request, user_id, version))
+    response.headers["X-Data-Version"] = str(version)
+
+
+def task_filters(
     status: Optional[bool] = Query(None, description="Фильтр по статусу (true=выполнено, false=активно)"),
     priority: Optional[str] = Query(None, description="Фильтр по приоритету (low/normal/high)"),
     search: Optional[str] = Query(None, description="Поиск по названию и описанию"),
+    search_mode: str = Query(
+        "substring",
+        pattern="^(fulltext|substring|fuzzy)$",
+        description="Режим поиска (substring — по подстроке, fulltext — по словам, fuzzy — с опечатками)"
+    ),
     category: Optional[str] = Query(None, description="Фильтр по категории"),
-    tag: Optional[str] = Query(None, description="Фильтр по тегу"),
-    sort_by: Optional[str] = Query("position", description="Сортировка (position/date/priority/title)"),
-    db: Session = Depends(get_db),
+    tag: Optional[List[str]] = Query(None, description="Фильтр по тегам (параметр можно повторять)"),
+    tag_mode: str = Query("all", pattern="^(all|any)$", description="Все теги (all) или любой из них (any)")
+) -> dict:
+    """Фильтры списка задач: общие для GET /tasks и массовых PATCH/DELETE /tasks."""
+    return {
+        "status": status,
+        "priority": priority,
+        "search": search,
+        "search_mode": search_mode,
+        "category": category,
+        "tags": tag,
+        "tag_mode": tag_mode,
+    }
+
+
+@router.get(
+    "/",
+    response_model=Union[List[schemas.TaskOut], List[schemas.TaskCompact]],
+    dependencies=[Depends(conditional_get)]
+)
+def read_tasks(
+    response: Response,
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (из заголовка X-Next-Cursor)"),
+    skip: int = Query(0, ge=0, description="Пропустить N записей (устаревшее, используйте cursor)"),
+    limit: int = Query(100, ge=1, le=500, description="Лимит записей"),
+    filters: dict = Depends(task_filters),
+    sort_by: Optional[str] = Query("position", description="Сортировка (position/date/priority/title/urgency/relevance)"),
+    view: str = Query("full", pattern="^(full|compact)$", description="Полные задачи или облегчённые для списка"),
+    db: Session = Depends(get_db, scope="function"),
     user_id: str = Depends(get_current_user)
 ):
     """
     Получить список задач с фильтрацией и пагинацией.
     
-    - **skip**: количество пропускаемых записей
+    - **cursor**: курсор следующей страницы
+    - **skip**: количество пропускаемых записей (устаревшее, игнорируется при cursor)
     - **limit**: максимальное количество записей
     - **status**: фильтр по статусу выполнения
     - **priority**: фильтр по приоритету
-    - **search**: поиск по тексту в названии и описании
+    - **search**: поиск в названии и описании
+    - **search_mode**: substring (по умолчанию) — по подстроке (поиск по мере ввода;
+      в Postgres фрагмент из 1–2 символов ищется только по началу названия),
+      fulltext — по целым словам (синтаксис веб-поиска: "фраза", -слово, OR), fuzzy — с опечатками,
+      по убыванию похожести, не более 50 результатов одной страницей
     - **category**: фильтр по категории
-    - **tag**: фильтр по тегу
-    - **sort_by**: сортировка (position, date, priority, title)
+    - **tag**: фильтр по тегам, например tag=a&tag=b
+    - **tag_mode**: all — задача содержит все теги, any — хотя бы один
+    - **sort_by**: сортировка (position, date, priority, title,
+      urgency — открытые по приоритету и сроку, relevance — по релевантности поиска, при search_mode=fulltext)
+    - **view**: full — задачи целиком, compact — только поля для списка
+      (id, title, priority, status, date_time, position, category, tags)
+    
+    Если есть следующая страница, её курсор возвращается в заголовке X-Next-Cursor.
     """
-    return crud.get_tasks(
+    tasks, next_cursor = crud.get_tasks_page(
         db=db,
         user_id=user_id,
+        cursor=cursor,
         skip=skip,
         limit=limit,
-        status=status,
-        priority=priority,
-        search=search,
-        category=category,
-        tag=tag,
-        sort_by=sort_by
+        sort_by=sort_by,
+        view=view,
+        **filters
+    )
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return tasks
+
+
+@router.patch("/", response_model=schemas.MassUpdateOut)
+def update_tasks_where(
+    task: schemas.TaskUpdate,
+    filters: dict = Depends(task_filters),
+    dry_run: bool = Query(False, description="Только посчитать задачи под фильтром, ничего не меняя"),
+    max_affected: int = Query(
+        crud.MASS_MAX_AFFECTED, ge=1, le=10000, description="Не менять ничего, если задач под фильтром больше"
+    ),
+    all_tasks: bool = Query(False, alias="all", description="Подтвердить изменение всех задач, когда фильтров нет"),
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Изменить все задачи под фильтром одним запросом.
+
+    - фильтры те же, что у GET /tasks (status, priority, search, search_mode,
+      category, tag, tag_mode); без фильтров отвечает 422, для всех задач
+      пользователя нужен явный all=true
+    - **dry_run**: вернуть количество подходящих задач без изменений
+    - **max_affected**: если задач больше, отвечает 422 и ничего не меняет
+
+    Тело — поля для изменения, как в PUT /tasks/{id}. Например, «выполнить
+    всё в категории Работа»: PATCH /tasks?category=Работа с {"status": true}.
+    """
+    count = crud.update_tasks_where(
+        db, user_id, task, dry_run=dry_run, max_affected=max_affected, all_tasks=all_tasks, **filters
+    )
+    return {"count": count, "dry_run": dry_run}
+
+
+@router.delete("/", response_model=schemas.MassUpdateOut)
+def delete_tasks_where(
+    filters: dict = Depends(task_filters),
+    dry_run: bool = Query(False, description="Только посчитать задачи под фильтром, ничего не удаляя"),
+    max_affected: int = Query(
+        crud.MASS_MAX_AFFECTED, ge=1, le=10000, description="Не удалять ничего, если задач под фильтром больше"
+    ),
+    all_tasks: bool = Query(False, alias="all", description="Подтвердить удаление всех задач, когда фильтров нет"),
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Удалить все задачи под фильтром одним запросом.
+
+    - фильтры те же, что у GET /tasks; например, «удалить выполненные»:
+      DELETE /tasks?status=true; без фильтров отвечает 422, для удаления
+      всех задач нужен явный all=true
+    - **dry_run**: вернуть количество подходящих задач без удаления
+    - **max_affected**: если задач больше, отвечает 422 и ничего не удаляет
+    """
+    count = crud.delete_tasks_where(
+        db, user_id, dry_run=dry_run, max_affected=max_affected, all_tasks=all_tasks, **filters
     )
+    return {"count": count, "dry_run": dry_run}
+
+
+@router.get("/stats", response_model=schemas.TaskStatsOut)
+def read_task_stats(
+    request: Request,
+    response: Response,
+    tz: Optional[str] = Query(None, description="Часовой пояс клиента (IANA, например Europe/Moscow)"),
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Получить счётчики задач для дашборда.
+
+    - **tz**: часовой пояс клиента для границ «сегодня» и «просрочено» (по умолчанию UTC)
+
+    Считается на сервере по всем задачам пользователя, без загрузки списка.
+    """
+    stats = crud.get_task_stats(db, user_id, tz)
+    # Счётчики меняются и со временем, поэтому ETag строится по самим значениям;
+    # они берутся из кэша текущей версии данных, так что 304 тоже дешёвый
+    tag = etag.content_etag(user_id, request.url.path, request.query_params.multi_items(), stats)
+    etag.check_etag(request, response, tag)
+    return stats
+
+
+@router.get("/stats/history", response_model=List[schemas.DailyStatOut])
+def read_task_stats_history(
+    date_from: Optional[date] = Query(None, alias="from", description="Первый день периода (по умолчанию 29 дней назад)"),
+    date_to: Optional[date] = Query(None, alias="to", description="Последний день периода (по умолчанию сегодня)"),
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Получить историю продуктивности по дням (UTC): создано, выполнено, переоткрыто.
+
+    - **from**, **to**: границы периода включительно, не длиннее 366 дней
+
+    Дни без событий возвращаются с нулями.
+    """
+    date_to = date_to or datetime.utcnow().date()
+    date_from = date_from or date_to - timedelta(days=29)
+    return crud.get_daily_stats(db, user_id, date_from, date_to)
+
+
+@router.get(
+    "/batch",
+    response_model=schemas.TaskBatchOut,
+    dependencies=[Depends(conditional_get)]
+)
+def read_tasks_batch(
+    ids: str = Query(..., pattern=r"^\d+(,\d+)*$", description="id задач через запятую, например 1,2,3"),
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Получить задачи по списку id одним запросом.
+
+    - **ids**: до 100 id через запятую; повторы игнорируются
+
+    Задачи возвращаются в порядке ids; отсутствующие и чужие id
+    перечисляются в missing, а не приводят к ошибке.
+    """
+    task_ids = list(dict.fromkeys(int(task_id) for task_id in ids.split(",")))
+    tasks, missing = crud.get_tasks_by_ids(db, user_id, task_ids)
+    return {"tasks": tasks, "missing": missing}
+
+
+@router.get(
+    "/changes",
+    response_model=schemas.TaskChangesOut,
+    dependencies=[Depends(conditional_get)]
+)
+def read_changes(
+    since: int = Query(0, ge=0, description="Токен из предыдущей синхронизации (0 — все задачи)"),
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Получить изменения задач после токена синхронизации.
+
+    - **since**: token из предыдущего ответа
+
+    Возвращает созданные и изменённые задачи, id удалённых и новый token.
+    Если токен устарел (старые удаления уже забыты) или изменений слишком
+    много, отвечает 410 — тогда нужно загрузить список заново.
+    """
+    return crud.get_changes(db, user_id, since)
+
+
+@router.get(
+    "/calendar",
+    response_model=List[schemas.TaskCompact],
+    dependencies=[Depends(conditional_get)]
+)
+def read_calendar(
+    response: Response,
+    date_from: datetime = Query(..., alias="from", description="Начало окна (включительно)"),
+    date_to: datetime = Query(..., alias="to", description="Конец окна (не включительно)"),
+    cursor: Optional[str] = Query(None, description="Курсор следующей страницы (из заголовка X-Next-Cursor)"),
+    limit: int = Query(500, ge=1, le=500, description="Лимит записей"),
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Получить задачи со сроком в окне календаря, по возрастанию срока.
+
+    - **from**, **to**: окно [from, to) в локальном времени клиента,
+      как хранится date_time (например 2025-03-01T00:00:00)
+    - **cursor**: курсор следующей страницы
+
+    Возвращаются только поля для ячейки календаря (как view=compact).
+    Если есть следующая страница, её курсор возвращается в заголовке X-Next-Cursor.
+    """
+    tasks, next_cursor = crud.get_calendar_page(db, user_id, date_from, date_to, limit=limit, cursor=cursor)
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return tasks
+
+
+@router.get(
+    "/calendar/summary",
+    response_model=List[schemas.CalendarDayOut],
+    dependencies=[Depends(conditional_get)]
+)
+def read_calendar_summary(
+    month: Optional[str] = Query(None, pattern=r"^\d{4}-(0[1-9]|1[0-2])$", description="Месяц в формате YYYY-MM"),
+    year: Optional[int] = Query(None, ge=1970, le=9999, description="Год целиком"),
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Получить счётчики задач по дням для обзора месяца или года.
+
+    - **month**: месяц (YYYY-MM) или **year**: год целиком — ровно один из параметров
+
+    Для каждого дня с задачами: всего, выполнено и с высоким приоритетом.
+    """
+    if (month is None) == (year is None):
+        raise ValidationError("Укажите либо month, либо year")
+    if month:
+        year, month_number = (int(part) for part in month.split("-"))
+        return crud.get_calendar_summary(db, user_id, year, month_number)
+    return crud.get_calendar_summary(db, user_id, year)
 
 
 @router.get("/{task_id}", response_model=schemas.TaskOut)
 def read_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db, scope="function"),
     user_id: str = Depends(get_current_user)
 ):
-    """Получить задачу по ID."""
-    return crud.get_task_by_id(db, task_id, user_id)
+    """
+    Получить задачу по ID.
+
+    ETag — версия задачи: с If-None-Match отвечает 304, пока задачу не
+    изменили; тот же тег передаётся в If-Match при PUT и DELETE.
+    """
+    task = crud.get_task_by_id(db, task_id, user_id)
+    etag.check_etag(request, response, etag.task_etag(task.version))
+    return task
 
 
 @router.post("/", response_model=schemas.TaskOut, status_code=status.HTTP_201_CREATED)
 def create_task(
     task: schemas.TaskCreate,
-    db: Session = Depends(get_db),
+    response: Response,
+    db: Session = Depends(get_db, scope="function"),
     user_id: str = Depends(get_current_user)
 ):
     """Создать новую задачу."""
-    return crud.create_task(db, task, user_id)
+    created = crud.create_task(db, task, user_id)
+    response.headers["ETag"] = etag.task_etag(created.version)
+    return created
+
+
+@router.post("/bulk", response_model=schemas.BulkResponse)
+def bulk_tasks(
+    request: schemas.BulkRequest,
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Применить пакет операций create/update/delete в одной транзакции.
+
+    - **operations**: до 200 операций, выполняются по порядку
+    - **mode**: atomic — всё или ничего (404, если задача не найдена),
+      best_effort — ошибочные операции пропускаются, остальные применяются
+
+    Возвращает результат каждой операции в порядке запроса.
+    """
+    results = crud.bulk_apply(db, user_id, request.operations, atomic=request.mode == "atomic")
+    return {"results": results}
 
 
 @router.put("/{task_id}", response_model=schemas.TaskOut)
 def update_task(
     task_id: int,
     task: schemas.TaskUpdate,
-    db: Session = Depends(get_db),
+    request: Request,
+    response: Response,
+    db: Session = Depends(get_db, scope="function"),
+    user_id: str = Depends(get_current_user)
+):
+    """
+    Обновить задачу.
+
+    С заголовком If-Match (ETag из GET или version задачи в кавычках)
+    задача изменяется, только если её не меняли с этой версии, иначе 412.
+    Без If-Match — как раньше, последняя запись побеждает.
+    """
+    updated = crud.update_task(db, task_id, task, user_id, expected_version=etag.if_match_version(request))
+    response.headers["ETag"] = etag.task_etag(updated.version)
+    return updated
+
+
+def rebalance_positions(bind, user_id: str):
+    """Фоновая перенумерация позиций: своя сессия, сессия запроса уже закрыта."""
+    with Session(bind=bind) as db:
+        crud.rebalance_positions(db, user_id)
+
+
+@router.post("/{task_id}/move", response_model=schemas.TaskOut)
+def move_task(
+    task_id: int,
+    move: schemas.TaskMove,
+    response: Response,
+    background_tasks: BackgroundTasks,
+    db: Session = Depends(get_db, scope="function"),
     user_id: str = Depends(get_current_user)
 ):
-    """Обновить задачу."""
-    return crud.update_task(db, task_id, task, user_id)
+    """
+    Переместить задачу в ручном порядке (drag-and-drop).
+
+    - **after_id**: задача, которая окажется прямо над перемещаемой
+    - **before_id**: задача, которая окажется прямо под ней
+
+    Достаточно одного из соседей (after_id для конца списка, before_id для
+    начала), но лучше передавать обоих. Меняется позиция только этой задачи.
+    """
+    task, needs_rebalance = crud.move_task(db, task_id, user_id, after_id=move.after_id, before_id=move.before_id)
+    if needs_rebalance:
+        background_tasks.add_task(rebalance_positions, db.get_bind(), user_id)
+    response.headers["ETag"] = etag.task_etag(task.version)
+    return task
 
 
 @router.delete("/{task_id}", status_code=status.HTTP_204_NO_CONTENT)
 def delete_task(
     task_id: int,
-    db: Session = Depends(get_db),
+    request: Request,
+    db: Session = Depends(get_db, scope="function"),
     user_id: str = Depends(get_current_user)
 ):
-    """Удалить задачу."""
-    crud.delete_task(db, task_id, user_id)
+    """Удалить задачу. С If-Match — только если её не меняли с этой версии, иначе 412."""
+    crud.delete_task(db, task_id, user_id, expected_version=etag.if_match_version(request))
     return None
 
 
-@router.get("/metadata/categories", response_model=List[str])
+@router.get(
+    "/metadata/categories",
+    response_model=List[schemas.MetadataItemOut],
+    dependencies=[Depends(conditional_get)]
+)
 def get_categories(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     user_id: str = Depends(get_current_user)
 ):
-    """Получить список всех категорий пользователя."""
+    """Получить категории пользователя со счётчиками активных и выполненных задач."""
     return crud.get_categories(db, user_id)
 
 
-@router.get("/metadata/tags", response_model=List[str])
+@router.get(
+    "/metadata/tags",
+    response_model=List[schemas.MetadataItemOut],
+    dependencies=[Depends(conditional_get)]
+)
 def get_tags(
-    db: Session = Depends(get_db),
+    db: Session = Depends(get_db, scope="function"),
     user_id: str = Depends(get_current_user)
 ):
-    """Получить список всех тегов пользователя."""
+    """Получить теги пользователя со счётчиками активных и выполненных задач."""
     return crud.get_all_tags(db, user_id)
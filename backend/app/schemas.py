@@ -1,6 +1,6 @@
 from pydantic import BaseModel, ConfigDict, Field, EmailStr, validator, field_validator
-from typing import Optional, List
-from datetime import datetime
+from typing import Annotated, Literal, Optional, List, Union
+from datetime import date, datetime
 import re
 
 # ==================== USER SCHEMAS ====================
@@ -82,7 +82,7 @@ class TaskBase(BaseModel):
     description: Optional[str] = Field(None, max_length=5000, description="Task description")
     date_time: Optional[datetime] = None
     priority: Optional[str] = Field("normal", pattern="^(low|normal|high)$")
-    position: Optional[int] = Field(0, ge=0)
+    position: Optional[int] = Field(None, ge=0)  # None — в конец списка
     category: Optional[str] = Field(None, max_length=100)
     tags: Optional[List[str]] = Field(default_factory=list)
     
@@ -105,7 +105,7 @@ class TaskUpdate(BaseModel):
     title: Optional[str] = None
     description: Optional[str] = None
     date_time: Optional[datetime] = None
-    priority: Optional[str] = None
+    priority: Optional[str] = Field(None, pattern="^(low|normal|high)$")
     status: Optional[bool] = None
     position: Optional[int] = None
     category: Optional[str] = None
@@ -113,11 +113,169 @@ class TaskUpdate(BaseModel):
 
 class TaskOut(TaskBase):
     id: int
-    user_id: int  # Теперь это integer, связь с User
+    user_id: str  # Telegram ID пользователя (tasks.user_id — строка)
     status: bool
     created_at: datetime
     position: int
     category: Optional[str] = None
     tags: List[str] = Field(default_factory=list)
+    version: int = 1  # Версия строки: её же содержит ETag, её передают в If-Match
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class TaskCompact(BaseModel):
+    """Облегчённая задача для списков (view=compact): без описания и служебных полей"""
+    id: int
+    title: str
+    priority: Optional[str] = None
+    status: bool
+    date_time: Optional[datetime] = None
+    position: int
+    category: Optional[str] = None
+    tags: List[str] = Field(default_factory=list)
     
     model_config = ConfigDict(from_attributes=True)
+
+
+class TaskStatsOut(BaseModel):
+    """Счётчики задач для дашборда"""
+    total: int
+    completed: int
+    active: int
+    high_priority: int  # Приоритеты считаются только по активным задачам
+    normal_priority: int
+    low_priority: int
+    today: int  # Задачи со сроком сегодня (по часовому поясу клиента)
+    overdue: int  # Активные задачи со сроком в прошлом
+
+
+class DailyStatOut(BaseModel):
+    """События за день (UTC) для графика продуктивности"""
+    day: date
+    created: int
+    completed: int
+    reopened: int
+
+
+class CalendarDayOut(BaseModel):
+    """Плотность задач за день для обзора месяца и года"""
+    day: date
+    total: int
+    done: int
+    high_priority: int
+
+
+class TaskChangesOut(BaseModel):
+    """Изменения задач после токена синхронизации"""
+    token: int  # Передать как since в следующем запросе
+    upserts: List[TaskOut]  # Созданные и изменённые задачи
+    deleted: List[int]  # id удалённых задач
+
+
+class TaskBatchOut(BaseModel):
+    """Задачи по списку id"""
+    tasks: List[TaskOut]  # В порядке запроса
+    missing: List[int]  # id, которых нет (или они принадлежат другому пользователю)
+
+
+class MetadataItemOut(BaseModel):
+    """Категория или тег со счётчиками задач"""
+    name: str
+    active_count: int
+    completed_count: int
+    
+    model_config = ConfigDict(from_attributes=True)
+
+
+class ProfileOut(BaseModel):
+    """Профиль пользователя Telegram из initData"""
+    user_id: str
+    username: Optional[str] = None
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    language_code: Optional[str] = None
+    is_premium: bool = False
+
+
+class BootstrapTasks(BaseModel):
+    """Первая страница задач; etag совпадает с ETag GET /tasks/ с теми же параметрами"""
+    items: Union[List[TaskOut], List[TaskCompact]]
+    next_cursor: Optional[str] = None
+    etag: str
+
+
+class BootstrapMetadata(BaseModel):
+    """Категории или теги; etag совпадает с ETag соответствующего /tasks/metadata/*"""
+    items: List[MetadataItemOut]
+    etag: str
+
+
+class BootstrapStats(BaseModel):
+    """Счётчики дашборда; etag совпадает с ETag GET /tasks/stats с тем же tz"""
+    counters: TaskStatsOut
+    etag: str
+
+
+class BootstrapOut(BaseModel):
+    """Всё для холодного старта Mini App одним ответом"""
+    profile: ProfileOut
+    version: int  # Токен since для GET /tasks/changes
+    tasks: BootstrapTasks
+    categories: BootstrapMetadata
+    tags: BootstrapMetadata
+    stats: BootstrapStats
+
+
+class TaskMove(BaseModel):
+    """Новое место задачи в ручном порядке: между соседями after_id и before_id"""
+    after_id: Optional[int] = None  # Задача, которая окажется прямо над перемещаемой
+    before_id: Optional[int] = None  # Задача, которая окажется прямо под ней
+
+
+class BulkCreate(BaseModel):
+    """Операция пакета: создать задачу"""
+    op: Literal["create"]
+    data: TaskCreate
+
+
+class BulkUpdate(BaseModel):
+    """Операция пакета: изменить задачу (только переданные поля)"""
+    op: Literal["update"]
+    id: int
+    data: TaskUpdate
+
+
+class BulkDelete(BaseModel):
+    """Операция пакета: удалить задачу"""
+    op: Literal["delete"]
+    id: int
+
+
+class BulkRequest(BaseModel):
+    """Пакет операций над задачами"""
+    operations: List[Annotated[Union[BulkCreate, BulkUpdate, BulkDelete], Field(discriminator="op")]] = Field(
+        ..., min_length=1, max_length=200
+    )
+    # atomic — всё или ничего, best_effort — ошибочные операции пропускаются
+    mode: str = Field("atomic", pattern="^(atomic|best_effort)$")
+
+
+class BulkResult(BaseModel):
+    """Результат одной операции пакета"""
+    index: int
+    op: str
+    ok: bool
+    id: Optional[int] = None
+    task: Optional[TaskOut] = None  # Итоговое состояние для create/update
+    error: Optional[str] = None
+
+
+class BulkResponse(BaseModel):
+    results: List[BulkResult]
+
+
+class MassUpdateOut(BaseModel):
+    """Результат массового изменения или удаления задач по фильтру"""
+    count: int  # Затронуто задач (при dry_run — попадает под фильтр)
+    dry_run: bool
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Синхронные роуты (def + Session, пул потоков AnyIO) против асинхронных
+(async def + AsyncSession на asyncpg) под нагрузкой в 200 одновременных
+клиентов.
+
+Оба варианта отдают первую страницу задач (crud.get_tasks_page, limit 20)
+случайного пользователя bench_<n> и запускаются одинаково: uvicorn в
+отдельном процессе, один воркер: синхронный — с пулом app.database,
+асинхронный — с пулом тех же размеров из crud_async. Для каждого печатает
+запросы в секунду и перцентили задержки.
+
+Async-путь в приложение не входит, его зависимости ставятся отдельно:
+    pip install asyncpg "sqlalchemy[asyncio]"
+
+--latency-ms добавляет перед чтением pg_sleep в той же транзакции — так
+выглядит база в другой зоне доступности, когда запрос в основном ждёт сеть.
+
+Запуск на одной машине (клиент, сервер и база делят процессор, поэтому
+при 200 клиентах измеряется в основном их конкуренция):
+    DATABASE_URL=postgresql://... python benchmarks/bench_async.py
+
+Для решения о переходе на async клиент, приложение и Postgres должны
+быть на отдельных машинах:
+    # машина приложения (DATABASE_URL указывает на машину базы)
+    python benchmarks/bench_async.py --serve sync --bind 0.0.0.0 --port 8765
+    python benchmarks/bench_async.py --serve async --bind 0.0.0.0 --port 8766
+    # машина клиента (база уже заполнена: seed() или прошлый локальный запуск)
+    python benchmarks/bench_async.py --target http://app-host:8765 --label sync
+    python benchmarks/bench_async.py --target http://app-host:8766 --label async
+"""
+import argparse
+import asyncio
+import random
+import subprocess
+import sys
+import time
+
+from seed import get_engine, seed
+
+USERS = 50
+
+
+def make_app(kind: str, latency_ms: float):
+    """Минимальное приложение с одним роутом: kind = sync | async."""
+    from fastapi import FastAPI
+    from sqlalchemy import text
+    from app import crud, database
+    import crud_async
+
+    app = FastAPI()
+    wait = text("SELECT pg_sleep(:seconds)").bindparams(seconds=latency_ms / 1000)
+
+    if kind == "sync":
+        @app.get("/tasks/{user_id}")
+        def read_tasks(user_id: str):
+            with database.SessionLocal() as db:
+                if latency_ms:
+                    db.execute(wait)
+                tasks, _ = crud.get_tasks_page(db, user_id, limit=20)
+            return {"count": len(tasks)}
+    else:
+        @app.get("/tasks/{user_id}")
+        async def read_tasks(user_id: str):
+            async with crud_async.AsyncSessionLocal() as db:
+                if latency_ms:
+                    await db.execute(wait)
+                tasks, _ = await crud_async.get_tasks_page(db, user_id, limit=20)
+            return {"count": len(tasks)}
+
+    return app
+
+
+def serve(kind: str, host: str, port: int, latency_ms: float) -> None:
+    import uvicorn
+
+    uvicorn.run(make_app(kind, latency_ms), host=host, port=port, log_level="warning")
+
+
+async def load(base_url: str, concurrency: int, duration: float):
+    """Запросы в секунду и задержки (мс) за duration секунд."""
+    import httpx
+
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        # Прогрев: сервер поднялся, соединения пула открыты
+        for _ in range(100):
+            try:
+                await client.get("/tasks/bench_0")
+                break
+            except httpx.TransportError:
+                await asyncio.sleep(0.1)
+        await asyncio.gather(*(client.get(f"/tasks/bench_{n % USERS}") for n in range(concurrency)))
+
+        deadline = time.perf_counter() + duration
+
+        async def worker():
+            while time.perf_counter() < deadline:
+                started = time.perf_counter()
+                response = await client.get(f"/tasks/bench_{random.randrange(USERS)}")
+                response.raise_for_status()
+                latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return (
+        len(latencies) / elapsed,
+        latencies[len(latencies) // 2],
+        latencies[int(len(latencies) * 0.99)],
+    )
+
+
+def report(label: str, result) -> None:
+    rps, p50, p99 = result
+    print(f"{label:<8}{rps:>10.0f} req/s   p50 {p50:>8.1f}ms   p99 {p99:>8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=15.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--bind", default="127.0.0.1", help="Адрес сервера в режиме --serve")
+    parser.add_argument("--target", help="Только нагрузка на уже запущенный сервер (http://host:port)")
+    parser.add_argument("--label", default="target", help="Подпись результата для --target")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--no-seed", action="store_true")
+    parser.add_argument("--serve", choices=("sync", "async"), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.bind, args.port, args.latency_ms)
+        return
+
+    if args.target:
+        report(args.label, asyncio.run(load(args.target, args.concurrency, args.duration)))
+        return
+
+    if not args.no_seed:
+        seed(get_engine(), users=USERS, tasks_per_user=200)
+
+    for kind in ("sync", "async"):
+        server = subprocess.Popen([
+            sys.executable, __file__, "--serve", kind,
+            "--port", str(args.port), "--latency-ms", str(args.latency_ms),
+        ])
+        try:
+            result = asyncio.run(load(f"http://127.0.0.1:{args.port}", args.concurrency, args.duration))
+        finally:
+            server.terminate()
+            server.wait()
+        report(kind, result)
+
+
+if __name__ == "__main__":
+    main()
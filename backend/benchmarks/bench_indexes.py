@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Сравнение одноколоночных индексов (004_add_indexes) и составных
+индексов по user_id (006_composite_indexes) на типичных запросах списка.
+
+Запуск:
+    DATABASE_URL=postgresql://... python benchmarks/bench_indexes.py
+"""
+import argparse
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from seed import get_engine, seed, timed
+from app import crud
+
+LEGACY_INDEXES = [
+    "CREATE INDEX ix_tasks_user_id ON tasks (user_id)",
+    "CREATE INDEX ix_tasks_title ON tasks (title)",
+    "CREATE INDEX ix_tasks_date_time ON tasks (date_time)",
+    "CREATE INDEX ix_tasks_priority ON tasks (priority_rank)",
+    "CREATE INDEX ix_tasks_status ON tasks (status)",
+    "CREATE INDEX ix_tasks_category ON tasks (category)",
+    "CREATE INDEX ix_tasks_created_at ON tasks (created_at)",
+]
+
+COMPOSITE_INDEXES = [
+    "CREATE INDEX ix_tasks_user_position ON tasks "
+    "(user_id, position, created_at DESC NULLS LAST, id DESC)",
+    "CREATE INDEX ix_tasks_user_status_position ON tasks "
+    "(user_id, status, position, created_at DESC NULLS LAST, id DESC)",
+    "CREATE INDEX ix_tasks_user_date_time ON tasks (user_id, date_time DESC NULLS LAST, id DESC)",
+    "CREATE INDEX ix_tasks_user_priority_rank ON tasks (user_id, priority_rank DESC, position, id DESC)",
+    "CREATE INDEX ix_tasks_user_title ON tasks (user_id, title, id)",
+    "CREATE INDEX ix_tasks_user_category ON tasks (user_id, category)",
+]
+
+SCENARIOS = {
+    "position, limit 100": {},
+    "date, limit 100": {"sort_by": "date"},
+    "title, limit 100": {"sort_by": "title"},
+    "priority, limit 100": {"sort_by": "priority"},
+    "status=false, position": {"status": False},
+    "category, position": {"category": "Работа"},
+    "position, skip 5000": {"skip": 5000},
+}
+
+
+def use_indexes(engine, statements) -> None:
+    """Оставить на tasks из сравниваемых индексов только заданный набор."""
+    with engine.begin() as conn:
+        for statement in LEGACY_INDEXES + COMPOSITE_INDEXES:
+            name = statement.split()[2]
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+        for statement in statements:
+            conn.execute(text(statement))
+        conn.execute(text("ANALYZE tasks"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--tasks-per-user", type=int, default=500)
+    parser.add_argument("--heavy-user-tasks", type=int, default=20000)
+    parser.add_argument("--no-seed", action="store_true")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if not args.no_seed:
+        seed(engine, args.users, args.tasks_per_user, args.heavy_user_tasks)
+    Session = sessionmaker(bind=engine)
+
+    results = {}
+    for label, statements in (("single-column", LEGACY_INDEXES), ("composite", COMPOSITE_INDEXES)):
+        use_indexes(engine, statements)
+        with Session() as db:
+            for name, params in SCENARIOS.items():
+                ms = timed(lambda: crud.get_tasks(db, "bench_heavy", **params))
+                results.setdefault(name, {})[label] = ms
+
+    print(f"{'scenario':<28}{'single-column':>16}{'composite':>12}")
+    for name, row in results.items():
+        print(f"{name:<28}{row['single-column']:>14.2f}ms{row['composite']:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
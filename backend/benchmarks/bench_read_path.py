@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+Чтение страницы списка через ORM (db.query(models.Task)) против Core
+select() (crud.get_tasks) при limit=500.
+
+Для каждого варианта печатает процессорное время и пик выделенной
+памяти (tracemalloc) в пересчёте на одну строку. Время ожидания базы
+в процессорное время не входит, поэтому видна именно стоимость
+построения объектов на стороне приложения.
+
+Запуск:
+    DATABASE_URL=postgresql://... python benchmarks/bench_read_path.py
+"""
+import argparse
+import time
+import tracemalloc
+
+from sqlalchemy.orm import sessionmaker
+
+from seed import get_engine, seed
+from app import crud, models
+
+LIMIT = 500
+
+
+def orm_page(db):
+    """Прежний путь чтения: ORM-объекты Task в identity map сессии."""
+    return db.query(models.Task).filter(
+        models.Task.user_id == "bench_heavy"
+    ).order_by(
+        models.Task.position, models.Task.created_at.desc(), models.Task.id.desc()
+    ).limit(LIMIT).all()
+
+
+def core_page(db):
+    """Core select(): строки без ORM-объектов."""
+    return crud.get_tasks(db, "bench_heavy", limit=LIMIT)
+
+
+def compact_page(db):
+    """Core select() только с колонками облегчённого списка."""
+    return crud.get_tasks(db, "bench_heavy", limit=LIMIT, view="compact")
+
+
+def measure(Session, fn, repeat: int = 50):
+    """Медиана процессорного времени (мкс) и пик памяти (байт) на строку."""
+    samples = []
+    for _ in range(repeat):
+        with Session() as db:
+            started = time.process_time()
+            rows = fn(db)
+            samples.append((time.process_time() - started) / len(rows) * 10 ** 6)
+    samples.sort()
+
+    with Session() as db:
+        tracemalloc.start()
+        rows = fn(db)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return samples[len(samples) // 2], peak / len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--heavy-user-tasks", type=int, default=50000)
+    parser.add_argument("--no-seed", action="store_true")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if not args.no_seed:
+        seed(engine, users=50, tasks_per_user=200, heavy_user_tasks=args.heavy_user_tasks)
+    Session = sessionmaker(bind=engine)
+
+    print(f"{'limit=500':<24}{'CPU/строка':>14}{'память/строка':>16}")
+    for name, fn in (("ORM query", orm_page), ("Core select", core_page), ("Core select, compact", compact_page)):
+        cpu, memory = measure(Session, fn)
+        print(f"{name:<24}{cpu:>11.1f}мкс{memory:>14.0f}Б")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+"""
+Сколько запрос держит соединение из пула: сессия, закрываемая после
+отправки ответа (Depends(get_db), scope="request"), против закрываемой,
+как только тело ответа собрано (Depends(get_db, scope="function")).
+
+Оба роута отдают страницу задач (crud.get_tasks_page, response_model
+TaskOut) через тот же стек, что и app.main: GZip и http-middleware.
+Печатает медианы ожидания соединения, его удержания и всего запроса
+по таймингам database.get_db.
+
+Запуск:
+    DATABASE_URL=postgresql://... python benchmarks/bench_session_hold.py
+"""
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from sqlalchemy import text
+
+from seed import SEED_SQL, get_engine
+from app import crud, database, schemas
+
+USER_ID = "bench_hold"
+
+
+def make_app(timings: list):
+    """Приложение с роутами /request и /function и сбором db_timings."""
+    from fastapi import Depends, FastAPI, Query
+    from fastapi.middleware.gzip import GZipMiddleware
+    from sqlalchemy.orm import Session
+
+    app = FastAPI()
+
+    def read_tasks(db: Session, limit: int):
+        tasks, _ = crud.get_tasks_page(db, USER_ID, limit=limit)
+        return tasks
+
+    @app.get("/request", response_model=List[schemas.TaskOut])
+    def request_scope(limit: int = Query(200), db: Session = Depends(database.get_db)):
+        return read_tasks(db, limit)
+
+    @app.get("/function", response_model=List[schemas.TaskOut])
+    def function_scope(limit: int = Query(200), db: Session = Depends(database.get_db, scope="function")):
+        return read_tasks(db, limit)
+
+    @app.middleware("http")
+    async def passthrough(request, call_next):
+        return await call_next(request)
+
+    app.add_middleware(GZipMiddleware, minimum_size=1000)
+
+    async def collect(scope, receive, send):
+        # Снаружи всех middleware: к этому моменту ответ отправлен и сессия закрыта
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        if scope["type"] == "http":
+            state = scope.get("state", {})
+            timings.append((scope["path"], time.perf_counter() - started, state.get("db_timings", {})))
+
+    return collect
+
+
+async def run(limit: int, repeat: int):
+    import httpx
+
+    timings = []
+    transport = httpx.ASGITransport(app=make_app(timings))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for path in ("/request", "/function") * 3:
+            await client.get(path, params={"limit": limit}, headers={"Accept-Encoding": "gzip"})
+        timings.clear()
+        for _ in range(repeat):
+            for path in ("/request", "/function"):
+                await client.get(path, params={"limit": limit}, headers={"Accept-Encoding": "gzip"})
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--no-seed", action="store_true")
+    args = parser.parse_args()
+
+    if not args.no_seed:
+        with get_engine().begin() as conn:
+            conn.execute(text("DELETE FROM tasks WHERE user_id = :user_id"), {"user_id": USER_ID})
+            conn.execute(SEED_SQL, {"user_id": USER_ID, "count": args.limit})
+
+    timings = asyncio.run(run(args.limit, args.repeat))
+    for path in ("/request", "/function"):
+        rows = [(total, db) for name, total, db in timings if name == path]
+        checkout = statistics.median(db.get("db_checkout", 0) for _, db in rows) * 1000
+        hold = statistics.median(db.get("db_hold", 0) for _, db in rows) * 1000
+        total = statistics.median(total for total, _ in rows) * 1000
+        print(f"{path:<11}ожидание {checkout:>7.2f}ms   удержание {hold:>7.2f}ms   запрос {total:>7.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+Сортировка urgency против сортировки по позиции для пользователя с 50k задач.
+
+Сравнивает первую страницу urgency с индексом ix_tasks_user_urgency и без
+него, и то же для position, а также «клиентский» вариант: скачать все
+задачи и отсортировать их в Python.
+
+Запуск:
+    DATABASE_URL=postgresql://... python benchmarks/bench_urgency.py
+"""
+import argparse
+
+from sqlalchemy import text
+from sqlalchemy.orm import sessionmaker
+
+from seed import get_engine, seed, timed
+from app import crud
+
+URGENCY_INDEX = (
+    "CREATE INDEX ix_tasks_user_urgency ON tasks "
+    "(user_id, status, priority_rank DESC, date_time, id)"
+)
+
+
+def client_side_urgency(db):
+    """Как приходится делать сейчас на клиенте: всё загрузить и отсортировать."""
+    tasks = crud.get_tasks(db, "bench_heavy", limit=10 ** 6)
+    tasks.sort(key=lambda t: (
+        bool(t.status), -t.priority_rank, t.date_time is None, t.date_time or 0, t.id
+    ))
+    return tasks[:20]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--heavy-user-tasks", type=int, default=50000)
+    parser.add_argument("--no-seed", action="store_true")
+    args = parser.parse_args()
+
+    engine = get_engine()
+    if not args.no_seed:
+        seed(engine, users=50, tasks_per_user=200, heavy_user_tasks=args.heavy_user_tasks)
+    Session = sessionmaker(bind=engine)
+
+    def run(**params):
+        with Session() as db:
+            return timed(lambda: crud.get_tasks(db, "bench_heavy", **params))
+
+    rows = []
+    for limit in (20, 100):
+        rows.append((f"position, limit {limit}", run(sort_by="position", limit=limit)))
+        rows.append((f"urgency, limit {limit}", run(sort_by="urgency", limit=limit)))
+
+    with engine.begin() as conn:
+        conn.execute(text("DROP INDEX IF EXISTS ix_tasks_user_urgency"))
+    rows.append(("urgency без индекса, limit 20", run(sort_by="urgency", limit=20)))
+    with engine.begin() as conn:
+        conn.execute(text(URGENCY_INDEX))
+        conn.execute(text("ANALYZE tasks"))
+
+    with Session() as db:
+        rows.append(("на клиенте: всё + sort", timed(lambda: client_side_urgency(db), repeat=3)))
+
+    for name, ms in rows:
+        print(f"{name:<34}{ms:>10.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
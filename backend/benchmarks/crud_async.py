@@ -0,0 +1,87 @@
+# -*- coding: utf-8 -*-
+"""
+Асинхронный путь к базе для benchmarks/bench_async.py: engine на asyncpg,
+AsyncSessionLocal и async-версии функций crud.
+
+Роуты приложения работают через синхронные crud: переход на async
+отложен, пока его не подтвердит нагрузочный тест с клиентом, приложением
+и базой на отдельных машинах. Поэтому всё async живёт здесь, а не в app:
+у приложения один пул соединений, а asyncpg и greenlet ставятся только
+для бенчмарка:
+    pip install asyncpg "sqlalchemy[asyncio]"
+
+Запросы описаны один раз — в crud: функция здесь выполняет синхронную
+версию через AsyncSession.run_sync. Это не поток: под asyncpg ввод-вывод
+драйвера переключается в цикл событий через greenlet, поэтому запрос,
+ожидающий ответа Postgres, не занимает поток AnyIO. Но построение
+запроса и разбор строк идут по тому же синхронному пути ORM.
+"""
+import functools
+import os
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import seed  # noqa: F401  (добавляет backend/ в sys.path)
+from app import crud
+from app.database import RequestSession
+
+
+def async_url(url):
+    """Тот же адрес базы с драйвером asyncpg (postgresql:// -> postgresql+asyncpg://)."""
+    url = make_url(url)
+    if url.get_backend_name() != "postgresql":
+        raise ValueError(f"Async-бенчмарк поддерживает только Postgres, а не {url.get_backend_name()}")
+    return url.set(drivername="postgresql+asyncpg")
+
+
+# Те же настройки пула, что у app.database.engine
+async_engine = create_async_engine(
+    async_url(os.environ["DATABASE_URL"]),
+    pool_size=10,
+    max_overflow=20,
+    pool_pre_ping=True,
+    pool_recycle=3600,
+)
+# expire_on_commit=False: после commit атрибуты объектов читаются без
+# нового запроса (ленивая загрузка вне await в AsyncSession невозможна)
+AsyncSessionLocal = async_sessionmaker(
+    async_engine, sync_session_class=RequestSession, autoflush=False, expire_on_commit=False
+)
+
+
+def _run_sync(fn):
+    """crud.fn(db: Session, ...) -> async fn(db: AsyncSession, ...)."""
+    @functools.wraps(fn)
+    async def wrapper(db: AsyncSession, *args, **kwargs):
+        return await db.run_sync(fn, *args, **kwargs)
+    return wrapper
+
+
+# Чтение
+get_tasks = _run_sync(crud.get_tasks)
+get_tasks_page = _run_sync(crud.get_tasks_page)
+get_calendar_page = _run_sync(crud.get_calendar_page)
+get_calendar_summary = _run_sync(crud.get_calendar_summary)
+get_task_by_id = _run_sync(crud.get_task_by_id)
+get_tasks_by_ids = _run_sync(crud.get_tasks_by_ids)
+get_data_version = _run_sync(crud.get_data_version)
+get_categories = _run_sync(crud.get_categories)
+get_all_tags = _run_sync(crud.get_all_tags)
+get_task_stats = _run_sync(crud.get_task_stats)
+get_daily_stats = _run_sync(crud.get_daily_stats)
+get_changes = _run_sync(crud.get_changes)
+
+# Запись
+create_task = _run_sync(crud.create_task)
+update_task = _run_sync(crud.update_task)
+delete_task = _run_sync(crud.delete_task)
+move_task = _run_sync(crud.move_task)
+rebalance_positions = _run_sync(crud.rebalance_positions)
+bulk_apply = _run_sync(crud.bulk_apply)
+update_tasks_where = _run_sync(crud.update_tasks_where)
+delete_tasks_where = _run_sync(crud.delete_tasks_where)
+
+# Обслуживание
+backfill_daily_stats = _run_sync(crud.backfill_daily_stats)
+compact_tombstones = _run_sync(crud.compact_tombstones)
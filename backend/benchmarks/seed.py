@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Заполнение Postgres синтетическими задачами для бенчмарков.
+
+Ожидает базу, мигрированную до head (alembic upgrade head), и берёт
+адрес из DATABASE_URL. Данные генерируются одним INSERT ... SELECT
+на стороне сервера, поэтому 100k+ строк создаются за секунды.
+"""
+import os
+import sys
+import time
+
+from sqlalchemy import create_engine, text
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+SEED_SQL = text("""
+    INSERT INTO tasks (user_id, title, description, date_time, priority_rank, status,
+                       position, category, tags, created_at, updated_at)
+    SELECT
+        :user_id,
+        'Задача ' || g || ' ' || md5(g::text),
+        repeat(md5((g * 7)::text) || ' ', 1 + g % 40),
+        CASE WHEN g % 5 = 0 THEN NULL
+             ELSE timestamp '2025-01-01' + (g % 730) * interval '1 day' + (g % 24) * interval '1 hour' END,
+        1 + g % 3,
+        g % 4 = 0,
+        g % 1000,
+        (ARRAY['Работа', 'Дом', 'Учёба', 'Спорт', NULL])[1 + g % 5],
+        json_build_array('tag' || (g % 20), 'tag' || (g % 7)),
+        timestamp '2024-01-01' + g * interval '1 minute',
+        timestamp '2024-01-01' + g * interval '1 minute'
+    FROM generate_series(1, :count) AS g
+""")
+
+
+def get_engine():
+    """Engine для DATABASE_URL."""
+    return create_engine(os.environ["DATABASE_URL"])
+
+
+def seed(engine, users: int, tasks_per_user: int, heavy_user_tasks: int = 0) -> None:
+    """
+    Очистить tasks и создать задачи для users пользователей
+    (user_id = "bench_<n>") плюс, опционально, одного «тяжёлого» bench_heavy.
+    """
+    started = time.perf_counter()
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE tasks RESTART IDENTITY"))
+        for n in range(users):
+            conn.execute(SEED_SQL, {"user_id": f"bench_{n}", "count": tasks_per_user})
+        if heavy_user_tasks:
+            conn.execute(SEED_SQL, {"user_id": "bench_heavy", "count": heavy_user_tasks})
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE tasks"))
+    total = users * tasks_per_user + heavy_user_tasks
+    print(f"Создано {total} задач за {time.perf_counter() - started:.1f}s")
+
+
+def timed(fn, repeat: int = 20) -> float:
+    """Медиана времени выполнения fn в миллисекундах."""
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    samples.sort()
+    return samples[len(samples) // 2]
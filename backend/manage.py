@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Служебные команды обслуживания базы.
+
+Запуск:
+    python manage.py backfill-daily-stats [--user USER_ID]
+    python manage.py compact-tombstones [--older-than-days N]
+"""
+import argparse
+
+from app import crud
+from app.database import SessionLocal
+
+
+def backfill_daily_stats(args):
+    """Пересчитать дневные сводки task_daily_stats по существующим задачам."""
+    with SessionLocal() as db:
+        rows = crud.backfill_daily_stats(db, user_id=args.user)
+    print(f"✅ task_daily_stats: записано {rows} строк")
+
+
+def compact_tombstones(args):
+    """Удалить старые надгробия удалённых задач."""
+    with SessionLocal() as db:
+        removed = crud.compact_tombstones(db, older_than_days=args.older_than_days)
+    print(f"✅ task_tombstones: удалено {removed} записей")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser(
+        "backfill-daily-stats", help="Заполнить task_daily_stats по существующим задачам"
+    )
+    backfill.add_argument("--user", help="Только для этого пользователя")
+    backfill.set_defaults(handler=backfill_daily_stats)
+
+    compact = commands.add_parser(
+        "compact-tombstones", help="Удалить надгробия удалённых задач (запускать периодически)"
+    )
+    compact.add_argument("--older-than-days", type=int, default=30,
+                         help="Хранить надгробия не меньше N дней (по умолчанию 30)")
+    compact.set_defaults(handler=compact_tombstones)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""composite per-user indexes for tasks
+
+Revision ID: 006_composite_indexes
+Revises: 005_create_users
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '006_composite_indexes'
+down_revision = '005_create_users'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Составные индексы по user_id: хвост совпадает с ORDER BY сортировок в crud.get_tasks
+    op.create_index('ix_tasks_user_position', 'tasks', [
+        'user_id', 'position', sa.text('created_at DESC NULLS LAST'), sa.text('id DESC'),
+    ])
+    op.create_index('ix_tasks_user_status_position', 'tasks', [
+        'user_id', 'status', 'position', sa.text('created_at DESC NULLS LAST'), sa.text('id DESC'),
+    ])
+    op.create_index('ix_tasks_user_date_time', 'tasks', [
+        'user_id', sa.text('date_time DESC NULLS LAST'), sa.text('id DESC'),
+    ])
+    op.create_index('ix_tasks_user_priority', 'tasks', [
+        'user_id', sa.text('priority DESC NULLS LAST'), sa.text('id DESC'),
+    ])
+    op.create_index('ix_tasks_user_title', 'tasks', ['user_id', 'title', 'id'])
+    op.create_index('ix_tasks_user_category', 'tasks', ['user_id', 'category'])
+
+    # Одноколоночные индексы перекрыты составными (или первичным ключом)
+    # и только удорожают запись
+    op.drop_index('ix_tasks_created_at', table_name='tasks')
+    op.drop_index('ix_tasks_category', table_name='tasks')
+    op.drop_index('ix_tasks_status', table_name='tasks')
+    op.drop_index('ix_tasks_priority', table_name='tasks')
+    op.drop_index('ix_tasks_date_time', table_name='tasks')
+    op.drop_index('ix_tasks_title', table_name='tasks')
+    op.drop_index('ix_tasks_user_id', table_name='tasks')
+    op.drop_index('ix_tasks_id', table_name='tasks')
+
+
+def downgrade():
+    op.create_index('ix_tasks_id', 'tasks', ['id'])
+    op.create_index('ix_tasks_user_id', 'tasks', ['user_id'])
+    op.create_index('ix_tasks_title', 'tasks', ['title'])
+    op.create_index('ix_tasks_date_time', 'tasks', ['date_time'])
+    op.create_index('ix_tasks_priority', 'tasks', ['priority'])
+    op.create_index('ix_tasks_status', 'tasks', ['status'])
+    op.create_index('ix_tasks_category', 'tasks', ['category'])
+    op.create_index('ix_tasks_created_at', 'tasks', ['created_at'])
+
+    op.drop_index('ix_tasks_user_category', table_name='tasks')
+    op.drop_index('ix_tasks_user_title', table_name='tasks')
+    op.drop_index('ix_tasks_user_priority', table_name='tasks')
+    op.drop_index('ix_tasks_user_date_time', table_name='tasks')
+    op.drop_index('ix_tasks_user_status_position', table_name='tasks')
+    op.drop_index('ix_tasks_user_position', table_name='tasks')
@@ -0,0 +1,37 @@
+"""full-text search vector for tasks
+
+Revision ID: 007_task_search_vector
+Revises: 006_composite_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007_task_search_vector'
+down_revision = '006_composite_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Генерируемая колонка: Postgres сам пересчитывает её при изменении
+    # title/description и заполняет для существующих строк при добавлении.
+    # Конфигурация 'russian' должна совпадать с crud.SEARCH_CONFIG.
+    op.execute("""
+        ALTER TABLE tasks ADD COLUMN search_vector tsvector
+        GENERATED ALWAYS AS (
+            setweight(to_tsvector('russian'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('russian'::regconfig, coalesce(description, '')), 'B')
+        ) STORED
+    """)
+    op.create_index(
+        'ix_tasks_search_vector', 'tasks', ['search_vector'],
+        postgresql_using='gin',
+    )
+
+
+def downgrade():
+    op.drop_index('ix_tasks_search_vector', table_name='tasks')
+    op.drop_column('tasks', 'search_vector')
@@ -0,0 +1,38 @@
+"""trigram indexes for substring and fuzzy task search
+
+Revision ID: 008_task_trigram_indexes
+Revises: 007_task_search_vector
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '008_task_trigram_indexes'
+down_revision = '007_task_search_vector'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+
+    # GIN по триграммам обслуживает ILIKE '%...%' (от трёх символов),
+    # а также операторы похожести % и <% нечёткого поиска
+    op.create_index(
+        'ix_tasks_title_trgm', 'tasks', ['title'],
+        postgresql_using='gin',
+        postgresql_ops={'title': 'gin_trgm_ops'},
+    )
+    op.create_index(
+        'ix_tasks_description_trgm', 'tasks', ['description'],
+        postgresql_using='gin',
+        postgresql_ops={'description': 'gin_trgm_ops'},
+    )
+
+
+def downgrade():
+    op.drop_index('ix_tasks_description_trgm', table_name='tasks')
+    op.drop_index('ix_tasks_title_trgm', table_name='tasks')
+    # Расширение не удаляем: им могут пользоваться другие объекты базы
@@ -0,0 +1,47 @@
+"""store task tags as jsonb with a GIN index
+
+Revision ID: 009_tasks_tags_jsonb
+Revises: 008_task_trigram_indexes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import JSONB
+
+# revision identifiers, used by Alembic.
+revision = '009_tasks_tags_jsonb'
+down_revision = '008_task_trigram_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # json нельзя проиндексировать GIN: переводим колонку в jsonb
+    op.alter_column('tasks', 'tags', server_default=None)
+    op.alter_column(
+        'tasks', 'tags',
+        type_=JSONB,
+        postgresql_using='tags::jsonb',
+    )
+    op.alter_column('tasks', 'tags', server_default=sa.text("'[]'::jsonb"))
+
+    # Старые строки без тегов: NULL -> [], чтобы @> работал единообразно
+    op.execute("UPDATE tasks SET tags = '[]'::jsonb WHERE tags IS NULL OR jsonb_typeof(tags) <> 'array'")
+
+    op.create_index(
+        'ix_tasks_tags', 'tasks', ['tags'],
+        postgresql_using='gin',
+        postgresql_ops={'tags': 'jsonb_path_ops'},
+    )
+
+
+def downgrade():
+    op.drop_index('ix_tasks_tags', table_name='tasks')
+    op.alter_column('tasks', 'tags', server_default=None)
+    op.alter_column(
+        'tasks', 'tags',
+        type_=sa.JSON,
+        postgresql_using='tags::json',
+    )
+    op.alter_column('tasks', 'tags', server_default=sa.text("'[]'::json"))
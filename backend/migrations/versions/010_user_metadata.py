@@ -0,0 +1,52 @@
+"""per-user category and tag summaries with counts
+
+Revision ID: 010_user_metadata
+Revises: 009_tasks_tags_jsonb
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '010_user_metadata'
+down_revision = '009_tasks_tags_jsonb'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('user_categories', 'user_tags'):
+        op.create_table(
+            table,
+            sa.Column('user_id', sa.String(), nullable=False),
+            sa.Column('name', sa.String(), nullable=False),
+            sa.Column('active_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.Column('completed_count', sa.Integer(), nullable=False, server_default='0'),
+            sa.PrimaryKeyConstraint('user_id', 'name'),
+        )
+
+    # Заполняем сводки по существующим задачам (дальше их ведёт crud)
+    op.execute("""
+        INSERT INTO user_categories (user_id, name, active_count, completed_count)
+        SELECT user_id, category,
+               count(*) FILTER (WHERE NOT coalesce(status, false)),
+               count(*) FILTER (WHERE coalesce(status, false))
+        FROM tasks
+        WHERE user_id IS NOT NULL AND category IS NOT NULL AND category <> ''
+        GROUP BY user_id, category
+    """)
+    op.execute("""
+        INSERT INTO user_tags (user_id, name, active_count, completed_count)
+        SELECT user_id, tag,
+               count(DISTINCT id) FILTER (WHERE NOT coalesce(status, false)),
+               count(DISTINCT id) FILTER (WHERE coalesce(status, false))
+        FROM tasks, jsonb_array_elements_text(tags) AS tag
+        WHERE user_id IS NOT NULL AND tag <> ''
+        GROUP BY user_id, tag
+    """)
+
+
+def downgrade():
+    op.drop_table('user_tags')
+    op.drop_table('user_categories')
@@ -0,0 +1,50 @@
+"""store task priority as a smallint ordinal
+
+Revision ID: 011_priority_rank
+Revises: 010_user_metadata
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '011_priority_rank'
+down_revision = '010_user_metadata'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # low=1, normal=2, high=3 (models.PRIORITY_RANKS); пустой приоритет считаем normal
+    op.add_column('tasks', sa.Column('priority_rank', sa.SmallInteger(), nullable=True))
+    op.execute("""
+        UPDATE tasks SET priority_rank = CASE priority
+            WHEN 'high' THEN 3
+            WHEN 'low' THEN 1
+            ELSE 2
+        END
+    """)
+    op.alter_column('tasks', 'priority_rank', nullable=False, server_default='2')
+
+    op.create_index('ix_tasks_user_priority_rank', 'tasks', [
+        'user_id', sa.text('priority_rank DESC'), 'position', sa.text('id DESC'),
+    ])
+    op.drop_index('ix_tasks_user_priority', table_name='tasks')
+    op.drop_column('tasks', 'priority')
+
+
+def downgrade():
+    op.add_column('tasks', sa.Column('priority', sa.String(), nullable=True))
+    op.execute("""
+        UPDATE tasks SET priority = CASE priority_rank
+            WHEN 3 THEN 'high'
+            WHEN 1 THEN 'low'
+            ELSE 'normal'
+        END
+    """)
+    op.create_index('ix_tasks_user_priority', 'tasks', [
+        'user_id', sa.text('priority DESC NULLS LAST'), sa.text('id DESC'),
+    ])
+    op.drop_index('ix_tasks_user_priority_rank', table_name='tasks')
+    op.drop_column('tasks', 'priority_rank')
@@ -0,0 +1,27 @@
+"""index for the urgency sort of tasks
+
+Revision ID: 012_urgency_index
+Revises: 011_priority_rank
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '012_urgency_index'
+down_revision = '011_priority_rank'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Совпадает с ORDER BY сортировки urgency: первые N самых срочных
+    # задач читаются диапазоном индекса с LIMIT, без сортировки
+    op.create_index('ix_tasks_user_urgency', 'tasks', [
+        'user_id', 'status', sa.text('priority_rank DESC'), 'date_time', 'id',
+    ])
+
+
+def downgrade():
+    op.drop_index('ix_tasks_user_urgency', table_name='tasks')
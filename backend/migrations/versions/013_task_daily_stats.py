@@ -0,0 +1,32 @@
+"""daily productivity rollup per user
+
+Revision ID: 013_task_daily_stats
+Revises: 012_urgency_index
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '013_task_daily_stats'
+down_revision = '012_urgency_index'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Заполняется командой `python manage.py backfill-daily-stats`, дальше её ведёт crud
+    op.create_table(
+        'task_daily_stats',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('created', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('completed', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('reopened', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('user_id', 'day'),
+    )
+
+
+def downgrade():
+    op.drop_table('task_daily_stats')
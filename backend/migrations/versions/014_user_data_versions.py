@@ -0,0 +1,29 @@
+"""per-user data version for conditional requests
+
+Revision ID: 014_user_data_versions
+Revises: 013_task_daily_stats
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '014_user_data_versions'
+down_revision = '013_task_daily_stats'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Строки появляются при первой записи пользователя (отсутствие = версия 0)
+    op.create_table(
+        'user_data_versions',
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('user_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('user_data_versions')
@@ -0,0 +1,44 @@
+"""change versions and tombstones for delta sync
+
+Revision ID: 015_task_changes
+Revises: 014_user_data_versions
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '015_task_changes'
+down_revision = '014_user_data_versions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Существующие задачи получают версию 0: их вернёт полная синхронизация
+    # (since=0 — crud.get_changes не ставит нижнюю границу), но не инкрементальная
+    op.add_column('tasks', sa.Column('changed_version', sa.BigInteger(), nullable=False, server_default='0'))
+    op.create_index('ix_tasks_user_changed_version', 'tasks', ['user_id', 'changed_version'])
+
+    op.add_column(
+        'user_data_versions',
+        sa.Column('tombstone_horizon', sa.BigInteger(), nullable=False, server_default='0'),
+    )
+    op.create_table(
+        'task_tombstones',
+        sa.Column('task_id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.String(), nullable=False),
+        sa.Column('deleted_version', sa.BigInteger(), nullable=False),
+        sa.Column('deleted_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+        sa.PrimaryKeyConstraint('task_id'),
+    )
+    op.create_index('ix_task_tombstones_user_version', 'task_tombstones', ['user_id', 'deleted_version'])
+
+
+def downgrade():
+    op.drop_index('ix_task_tombstones_user_version', table_name='task_tombstones')
+    op.drop_table('task_tombstones')
+    op.drop_column('user_data_versions', 'tombstone_horizon')
+    op.drop_index('ix_tasks_user_changed_version', table_name='tasks')
+    op.drop_column('tasks', 'changed_version')
@@ -0,0 +1,46 @@
+"""gapped bigint task positions for single-row moves
+
+Revision ID: 016_position_gaps
+Revises: 015_task_changes
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '016_position_gaps'
+down_revision = '015_task_changes'
+branch_labels = None
+depends_on = None
+
+# crud.POSITION_GAP
+POSITION_GAP = 1 << 24
+
+
+def _renumber(step):
+    # Порядок сортировки position: position, created_at DESC NULLS LAST, id DESC
+    op.execute(f"""
+        UPDATE tasks SET position = ranked.rank * {step}
+        FROM (
+            SELECT id, row_number() OVER (
+                PARTITION BY user_id
+                ORDER BY position NULLS LAST, created_at DESC NULLS LAST, id DESC
+            ) AS rank
+            FROM tasks
+        ) AS ranked
+        WHERE tasks.id = ranked.id
+    """)
+
+
+def upgrade():
+    op.alter_column('tasks', 'position', type_=sa.BigInteger(), existing_type=sa.Integer())
+    # Порядок задач сохраняется, между соседями появляется зазор POSITION_GAP
+    _renumber(POSITION_GAP)
+
+
+def downgrade():
+    # Разреженные позиции не помещаются в integer: возвращаемся к 0, 1, 2, ...
+    _renumber(1)
+    op.execute("UPDATE tasks SET position = position - 1")
+    op.alter_column('tasks', 'position', type_=sa.Integer(), existing_type=sa.BigInteger())
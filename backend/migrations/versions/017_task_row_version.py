@@ -0,0 +1,24 @@
+"""row version on tasks for If-Match optimistic concurrency
+
+Revision ID: 017_task_row_version
+Revises: 016_position_gaps
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '017_task_row_version'
+down_revision = '016_position_gaps'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Существующие задачи начинают с версии 1, как и новые
+    op.add_column('tasks', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    op.drop_column('tasks', 'version')
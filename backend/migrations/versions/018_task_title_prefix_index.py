@@ -0,0 +1,29 @@
+"""title prefix index for short search fragments
+
+Revision ID: 018_task_title_prefix_index
+Revises: 017_task_row_version
+Create Date: 2026-10-18
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '018_task_title_prefix_index'
+down_revision = '017_task_row_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Триграммы (008_task_trigram_indexes) не помогают фрагментам из 1–2
+    # символов: их crud ищет как lower(title) LIKE 'фр%'. text_pattern_ops
+    # даёт B-tree диапазон для LIKE по префиксу при любой collation базы
+    op.create_index(
+        'ix_tasks_user_title_prefix', 'tasks',
+        ['user_id', sa.text('lower(title) text_pattern_ops')],
+    )
+
+
+def downgrade():
+    op.drop_index('ix_tasks_user_title_prefix', table_name='tasks')
@@ -7,13 +7,14 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from app.main import app
-from app.database import Base
-from app.routers.tasks import get_db
+from app.cache import cache
+from app.database import RequestSession, get_db, session_dependency
+from app.models import Base
 
 # Используем in-memory SQLite для тестов
 SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
 engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+TestingSessionLocal = sessionmaker(class_=RequestSession, autocommit=False, autoflush=False, bind=engine)
 
 
 @pytest.fixture(scope="function")
@@ -26,18 +27,13 @@ def db():
     finally:
         db.close()
         Base.metadata.drop_all(bind=engine)
+        cache.clear()
 
 
 @pytest.fixture(scope="function")
 def client(db):
-    """Тестовый клиент FastAPI."""
-    def override_get_db():
-        try:
-            yield db
-        finally:
-            pass
-    
-    app.dependency_overrides[get_db] = override_get_db
+    """Тестовый клиент FastAPI (схему создаёт фикстура db)."""
+    app.dependency_overrides[get_db] = session_dependency(TestingSessionLocal)
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
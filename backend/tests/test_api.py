@@ -4,6 +4,7 @@
 """
 import pytest
 from fastapi import status
+from app.pagination import encode_cursor
 
 
 def test_health_endpoint(client):
@@ -136,3 +137,348 @@ def test_pagination(client):
     assert response.status_code == 200
     tasks = response.json()
     assert len(tasks) == 5
+
+
+def test_cursor_pagination(client):
+    """Тест курсорной пагинации через заголовок X-Next-Cursor."""
+    for i in range(7):
+        client.post("/tasks/", json={"title": f"Task {i}", "position": i % 3})
+    
+    seen = []
+    cursor = None
+    while True:
+        url = "/tasks/?limit=3" + (f"&cursor={cursor}" if cursor else "")
+        response = client.get(url)
+        assert response.status_code == 200
+        seen.extend(t["id"] for t in response.json())
+        cursor = response.headers.get("X-Next-Cursor")
+        if not cursor:
+            break
+    
+    assert len(seen) == 7
+    assert len(set(seen)) == 7
+
+
+def test_invalid_cursor(client):
+    """Тест отклонения повреждённого курсора."""
+    response = client.get("/tasks/?cursor=not-a-cursor")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    
+    # Курсор с правильной структурой, но значениями не того типа
+    for values in (["x", "2025-01-01T00:00:00", 1], [1, 2, 3], [1, None, True], [2 ** 70, None, 1]):
+        cursor = encode_cursor("position", values)
+        assert client.get(f"/tasks/?cursor={cursor}").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get(f"/tasks/?cursor={encode_cursor('position', [1, None, 1])}").status_code == 200
+
+
+def test_search_modes(client):
+    """Тест режимов поиска и валидации search_mode."""
+    client.post("/tasks/", json={"title": "Подготовить отчёт"})
+    client.post("/tasks/", json={"title": "Позвонить"})
+    
+    # По умолчанию — подстрока: начало слова находится при поиске по мере ввода
+    for query in ("search=отч", "search=отч&search_mode=substring"):
+        response = client.get(f"/tasks/?{query}")
+        assert response.status_code == 200
+        assert [t["title"] for t in response.json()] == ["Подготовить отчёт"]
+    
+    # fulltext и fuzzy ищут целые слова (в SQLite — тоже ILIKE, поэтому
+    # то, что fulltext не находит фрагмент, проверяет test_search_condition_modes)
+    for mode, search in (("fulltext", "отчёт"), ("fuzzy", "Позвонить")):
+        response = client.get(f"/tasks/?search={search}&search_mode={mode}")
+        assert response.status_code == 200
+        assert len(response.json()) == 1
+    
+    response = client.get("/tasks/?search=отч&search_mode=regex")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_get_tasks_by_multiple_tags(client):
+    """Тест фильтра tag=a&tag=b с tag_mode."""
+    client.post("/tasks/", json={"title": "Both", "tags": ["a", "b"]})
+    client.post("/tasks/", json={"title": "Only A", "tags": ["a"]})
+    
+    response = client.get("/tasks/?tag=a&tag=b")
+    assert [t["title"] for t in response.json()] == ["Both"]
+    
+    response = client.get("/tasks/?tag=a&tag=b&tag_mode=any")
+    assert len(response.json()) == 2
+
+
+def test_metadata_endpoints(client):
+    """Тест категорий и тегов со счётчиками."""
+    client.post("/tasks/", json={"title": "A", "category": "Работа", "tags": ["x"]})
+    
+    response = client.get("/tasks/metadata/categories")
+    assert response.status_code == 200
+    assert response.json() == [{"name": "Работа", "active_count": 1, "completed_count": 0}]
+    
+    response = client.get("/tasks/metadata/tags")
+    assert response.json() == [{"name": "x", "active_count": 1, "completed_count": 0}]
+
+
+def test_update_task_invalid_priority(client):
+    """Тест: при обновлении приоритет ограничен low/normal/high."""
+    task_id = client.post("/tasks/", json={"title": "Task"}).json()["id"]
+    
+    response = client.put(f"/tasks/{task_id}", json={"priority": "urgent"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_compact_view(client):
+    """Тест облегчённого списка: только поля для списка, курсор работает."""
+    for i in range(3):
+        client.post("/tasks/", json={"title": f"Task {i}", "description": "Длинное описание", "tags": ["x"]})
+    
+    response = client.get("/tasks/?view=compact&limit=2")
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+    assert set(data[0]) == {"id", "title", "priority", "status", "date_time", "position", "category", "tags"}
+    assert data[0]["priority"] == "normal"
+    assert data[0]["tags"] == ["x"]
+    
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/tasks/?view=compact&limit=2&cursor={cursor}")
+    assert len(response.json()) == 1
+    
+    assert client.get("/tasks/?view=minimal").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_task_stats(client):
+    """Тест статистики: считается на сервере, неизвестный часовой пояс — 422."""
+    client.post("/tasks/", json={"title": "A", "priority": "high"})
+    
+    response = client.get("/tasks/stats?tz=Europe/Moscow")
+    assert response.status_code == 200
+    assert response.json()["total"] == 1
+    assert response.json()["high_priority"] == 1
+    
+    response = client.get("/tasks/stats?tz=Mars/Olympus")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_task_stats_history(client):
+    """Тест истории по дням: период включительно, проверка границ."""
+    client.post("/tasks/", json={"title": "A"})
+    
+    response = client.get("/tasks/stats/history")
+    assert response.status_code == 200
+    assert len(response.json()) == 30
+    assert response.json()[-1]["created"] == 1
+    
+    response = client.get("/tasks/stats/history?from=2026-01-10&to=2026-01-01")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_calendar_window(client):
+    """Тест календаря: только задачи в окне, по возрастанию срока, с курсором."""
+    for title, date_time in (("late", "2025-03-20T10:00:00"), ("early", "2025-03-02T09:00:00"),
+                             ("next month", "2025-04-01T00:00:00"), ("same time", "2025-03-02T09:00:00")):
+        client.post("/tasks/", json={"title": title, "date_time": date_time})
+    client.post("/tasks/", json={"title": "no date"})
+    
+    response = client.get("/tasks/calendar?from=2025-03-01T00:00:00&to=2025-04-01T00:00:00&limit=2")
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()] == ["early", "same time"]
+    assert "description" not in response.json()[0]
+    
+    cursor = response.headers["X-Next-Cursor"]
+    response = client.get(f"/tasks/calendar?from=2025-03-01T00:00:00&to=2025-04-01T00:00:00&limit=2&cursor={cursor}")
+    assert [t["title"] for t in response.json()] == ["late"]
+    assert "X-Next-Cursor" not in response.headers
+    
+    response = client.get("/tasks/calendar?from=2025-04-01T00:00:00&to=2025-03-01T00:00:00")
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_calendar_summary(client):
+    """Тест обзора месяца и года: счётчики по дням, год поверх кэша месяца, сброс кэша при записи."""
+    client.post("/tasks/", json={"title": "A", "date_time": "2025-03-02T09:00:00", "priority": "high"})
+    task_id = client.post("/tasks/", json={"title": "B", "date_time": "2025-03-02T18:00:00"}).json()["id"]
+    client.post("/tasks/", json={"title": "C", "date_time": "2025-05-10T12:00:00"})
+    
+    response = client.get("/tasks/calendar/summary?month=2025-03")
+    assert response.status_code == 200
+    assert response.json() == [{"day": "2025-03-02", "total": 2, "done": 0, "high_priority": 1}]
+    
+    # Год поверх месяца из кэша без записи между запросами: дни не дублируются
+    assert client.get("/tasks/calendar/summary?year=2025").json() == [
+        {"day": "2025-03-02", "total": 2, "done": 0, "high_priority": 1},
+        {"day": "2025-05-10", "total": 1, "done": 0, "high_priority": 0},
+    ]
+    assert client.get("/tasks/calendar/summary?month=2025-03").json() == [
+        {"day": "2025-03-02", "total": 2, "done": 0, "high_priority": 1},
+    ]
+    
+    client.put(f"/tasks/{task_id}", json={"status": True})
+    response = client.get("/tasks/calendar/summary?year=2025")
+    assert response.json() == [
+        {"day": "2025-03-02", "total": 2, "done": 1, "high_priority": 1},
+        {"day": "2025-05-10", "total": 1, "done": 0, "high_priority": 0},
+    ]
+    
+    assert client.get("/tasks/calendar/summary").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.get("/tasks/calendar/summary?month=2025-13").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_conditional_get(client):
+    """Тест ETag: 304 при неизменных данных, новый тег после записи и для других параметров."""
+    client.post("/tasks/", json={"title": "A"})
+    
+    response = client.get("/tasks/?limit=10")
+    etag = response.headers["ETag"]
+    
+    response = client.get("/tasks/?limit=10", headers={"If-None-Match": etag})
+    assert response.status_code == status.HTTP_304_NOT_MODIFIED
+    assert response.content == b""
+    
+    assert client.get("/tasks/?limit=20").headers["ETag"] != etag
+    assert client.get("/tasks/metadata/tags", headers={"If-None-Match": etag}).status_code == 200
+    
+    client.post("/tasks/", json={"title": "B"})
+    response = client.get("/tasks/?limit=10", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert len(response.json()) == 2
+    
+    stats_etag = client.get("/tasks/stats").headers["ETag"]
+    assert client.get("/tasks/stats", headers={"If-None-Match": stats_etag}).status_code == status.HTTP_304_NOT_MODIFIED
+
+
+def test_changes_endpoint(client):
+    """Тест GET /tasks/changes: новый токен и удалённые id."""
+    task_id = client.post("/tasks/", json={"title": "A"}).json()["id"]
+    token = int(client.get("/tasks/").headers["X-Data-Version"])
+    assert client.get("/tasks/changes").json()["token"] == token
+    
+    client.delete(f"/tasks/{task_id}")
+    response = client.get(f"/tasks/changes?since={token}")
+    assert response.status_code == 200
+    assert response.json()["deleted"] == [task_id]
+    assert response.json()["upserts"] == []
+
+
+def test_bootstrap(client):
+    """Тест холодного старта: все разделы одним ответом, etag разделов совпадают с эндпоинтами."""
+    client.post("/tasks/", json={"title": "A", "category": "Работа", "tags": ["x"]})
+    
+    response = client.get("/bootstrap?limit=10")
+    assert response.status_code == 200
+    data = response.json()
+    assert [t["title"] for t in data["tasks"]["items"]] == ["A"]
+    assert data["categories"]["items"][0]["name"] == "Работа"
+    assert data["tags"]["items"][0]["name"] == "x"
+    assert data["stats"]["counters"]["total"] == 1
+    assert "user_id" in data["profile"]
+    
+    for path, section in (("/tasks/?limit=10", "tasks"), ("/tasks/metadata/categories", "categories"),
+                          ("/tasks/metadata/tags", "tags"), ("/tasks/stats", "stats")):
+        response = client.get(path, headers={"If-None-Match": data[section]["etag"]})
+        assert response.status_code == status.HTTP_304_NOT_MODIFIED, section
+
+
+def test_tasks_batch(client):
+    """Тест пакетного чтения: порядок запроса, отсутствующие id, лимит."""
+    first = client.post("/tasks/", json={"title": "A"}).json()["id"]
+    second = client.post("/tasks/", json={"title": "B"}).json()["id"]
+    
+    response = client.get(f"/tasks/batch?ids={second},99999,{first},{second}")
+    assert response.status_code == 200
+    assert [t["title"] for t in response.json()["tasks"]] == ["B", "A"]
+    assert response.json()["missing"] == [99999]
+    
+    assert client.get("/tasks/batch?ids=1,x").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    ids = ",".join(str(i) for i in range(1, 102))
+    assert client.get(f"/tasks/batch?ids={ids}").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+def test_bulk_endpoint(client):
+    """Тест POST /tasks/bulk: результаты по операциям, best_effort пропускает ошибки."""
+    task_id = client.post("/tasks/", json={"title": "A"}).json()["id"]
+    
+    response = client.post("/tasks/bulk", json={"mode": "best_effort", "operations": [
+        {"op": "create", "data": {"title": "B"}},
+        {"op": "delete", "id": 99999},
+        {"op": "update", "id": task_id, "data": {"priority": "high"}},
+    ]})
+    assert response.status_code == 200
+    results = response.json()["results"]
+    assert [r["ok"] for r in results] == [True, False, True]
+    assert results[2]["task"]["priority"] == "high"
+    
+    response = client.post("/tasks/bulk", json={"operations": [{"op": "delete", "id": 99999}]})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+    assert client.post("/tasks/bulk", json={"operations": [{"op": "rename", "id": 1}]}).status_code == 422
+
+
+def test_tasks_where_endpoints(client):
+    """Тест PATCH/DELETE /tasks по фильтру: те же фильтры, что у GET, dry_run и лимит."""
+    for title in ("A", "B"):
+        client.post("/tasks/", json={"title": title, "tags": ["x"]})
+    client.post("/tasks/", json={"title": "C"})
+    
+    response = client.patch("/tasks/?tag=x&dry_run=true", json={"priority": "high"})
+    assert response.json() == {"count": 2, "dry_run": True}
+    response = client.patch("/tasks/?tag=x&max_affected=1", json={"priority": "high"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.patch("/tasks/?tag=x", json={}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.patch("/tasks/", json={"priority": "high"}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.delete("/tasks/").status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.delete("/tasks/?all=true&dry_run=true").json() == {"count": 3, "dry_run": True}
+    
+    response = client.patch("/tasks/?tag=x", json={"priority": "high"})
+    assert response.json() == {"count": 2, "dry_run": False}
+    assert len(client.get("/tasks/?priority=high").json()) == 2
+    
+    response = client.delete("/tasks/?priority=high")
+    assert response.json() == {"count": 2, "dry_run": False}
+    assert [t["title"] for t in client.get("/tasks/").json()] == ["C"]
+
+
+def test_move_task_endpoint(client):
+    """Тест POST /tasks/{id}/move: порядок sort_by=position меняется."""
+    ids = [client.post("/tasks/", json={"title": title}).json()["id"] for title in "ABC"]
+    
+    response = client.post(f"/tasks/{ids[2]}/move", json={"after_id": ids[0], "before_id": ids[1]})
+    assert response.status_code == 200
+    assert [t["title"] for t in client.get("/tasks/?sort_by=position").json()] == ["A", "C", "B"]
+    
+    assert client.post(f"/tasks/{ids[0]}/move", json={}).status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert client.post(f"/tasks/{ids[0]}/move", json={"after_id": 99999}).status_code == status.HTTP_404_NOT_FOUND
+
+
+def test_task_if_match(client):
+    """Тест оптимистичной блокировки: ETag задачи, 304, If-Match и 412 при конфликте."""
+    task_id = client.post("/tasks/", json={"title": "A"}).json()["id"]
+    
+    response = client.get(f"/tasks/{task_id}")
+    etag = response.headers["ETag"]
+    assert etag == '"1"' and response.json()["version"] == 1
+    assert client.get(f"/tasks/{task_id}", headers={"If-None-Match": etag}).status_code == status.HTTP_304_NOT_MODIFIED
+    
+    # Первое устройство сохраняет, второе с тем же тегом получает 412
+    response = client.put(f"/tasks/{task_id}", json={"title": "B"}, headers={"If-Match": etag})
+    assert response.status_code == 200
+    assert response.headers["ETag"] == '"2"'
+    response = client.put(f"/tasks/{task_id}", json={"title": "C"}, headers={"If-Match": etag})
+    assert response.status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert client.delete(f"/tasks/{task_id}", headers={"If-Match": etag}).status_code == status.HTTP_412_PRECONDITION_FAILED
+    assert client.put(f"/tasks/{task_id}", json={"title": "C"}, headers={"If-Match": "garbage"}).status_code == 412
+    
+    assert client.get(f"/tasks/{task_id}").json()["title"] == "B"
+    assert client.delete(f"/tasks/{task_id}", headers={"If-Match": '"2"'}).status_code == status.HTTP_204_NO_CONTENT
+
+
+def test_db_session_timings(client):
+    """Тест Server-Timing: соединение берётся только при обращении к базе."""
+    client.post("/tasks/", json={"title": "A"})
+    
+    response = client.get("/tasks/")
+    timings = dict(item.split(";dur=") for item in response.headers["Server-Timing"].split(", "))
+    assert set(timings) == {"db_checkout", "db_hold"}
+    assert float(timings["db_hold"]) >= 0
+    
+    # Запрос отклонён валидацией до обращения к базе — соединение не бралось
+    response = client.post("/tasks/", json={"title": ""})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert "Server-Timing" not in response.headers
@@ -4,7 +4,10 @@
 """
 import pytest
 from app import crud, schemas, models
-from datetime import datetime
+from app.exceptions import SyncTokenExpiredError, TaskNotFoundError, ValidationError, VersionConflictError
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
 
 
 def test_create_task(db, test_user_id):
@@ -103,6 +106,41 @@ def test_get_task_by_id_not_found(db, test_user_id):
         crud.get_task_by_id(db, 999, test_user_id)
 
 
+def test_write_missing_task(db, test_user_id):
+    """Тест записи несуществующей или чужой задачи: TaskNotFoundError, версия данных не меняется."""
+    task = crud.create_task(db, schemas.TaskCreate(title="Чужая"), "other_user")
+    version = crud.get_data_version(db, test_user_id)
+    
+    for task_id in (999, task.id):
+        with pytest.raises(TaskNotFoundError):
+            crud.update_task(db, task_id, schemas.TaskUpdate(title="X"), test_user_id)
+        with pytest.raises(TaskNotFoundError):
+            crud.delete_task(db, task_id, test_user_id)
+    
+    assert crud.get_data_version(db, test_user_id) == version
+    assert crud.get_task_by_id(db, task.id, "other_user").title == "Чужая"
+
+
+def test_task_row_version(db, test_user_id):
+    """Тест версии строки: растёт при каждой записи, устаревшая версия — VersionConflictError."""
+    task = crud.create_task(db, schemas.TaskCreate(title="A"), test_user_id)
+    assert task.version == 1
+    
+    task = crud.update_task(db, task.id, schemas.TaskUpdate(title="B"), test_user_id, expected_version=1)
+    assert task.version == 2
+    with pytest.raises(VersionConflictError):
+        crud.update_task(db, task.id, schemas.TaskUpdate(title="C"), test_user_id, expected_version=1)
+    with pytest.raises(VersionConflictError):
+        crud.delete_task(db, task.id, test_user_id, expected_version=1)
+    with pytest.raises(TaskNotFoundError):
+        crud.update_task(db, 999, schemas.TaskUpdate(title="C"), test_user_id, expected_version=1)
+    assert crud.get_task_by_id(db, task.id, test_user_id).title == "B"
+    
+    crud.update_tasks_where(db, test_user_id, schemas.TaskUpdate(status=True), all_tasks=True)
+    assert crud.get_task_by_id(db, task.id, test_user_id).version == 3
+    crud.delete_task(db, task.id, test_user_id, expected_version=3)
+
+
 def test_user_isolation(db):
     """Тест изоляции задач между пользователями."""
     user1_id = "user1"
@@ -122,3 +160,322 @@ def test_user_isolation(db):
     assert len(user2_tasks) == 1
     assert user1_tasks[0].title == "Задача user1"
     assert user2_tasks[0].title == "Задача user2"
+
+
+@pytest.mark.parametrize("sort_by", ["position", "date", "priority", "title", "urgency"])
+def test_get_tasks_page_cursor(db, test_user_id, sort_by):
+    """Тест keyset-пагинации: страницы по курсору совпадают с полной выборкой."""
+    for i in range(9):
+        crud.create_task(
+            db,
+            schemas.TaskCreate(
+                title=f"Задача {i % 4}",
+                priority=["low", "normal", "high"][i % 3],
+                position=i % 2,
+                date_time=datetime(2025, 1, 1 + i % 3) if i % 4 else None,
+            ),
+            test_user_id
+        )
+    
+    expected = [t.id for t in crud.get_tasks(db, test_user_id, sort_by=sort_by)]
+    
+    paged = []
+    cursor = None
+    while True:
+        tasks, cursor = crud.get_tasks_page(db, test_user_id, limit=2, sort_by=sort_by, cursor=cursor)
+        paged.extend(t.id for t in tasks)
+        if cursor is None:
+            break
+    
+    assert paged == expected
+
+
+def test_get_tasks_relevance_without_fulltext(db, test_user_id):
+    """Тест: без полнотекстового поиска (SQLite) relevance сортирует по позиции."""
+    crud.create_task(db, schemas.TaskCreate(title="Купить молоко", position=1), test_user_id)
+    crud.create_task(db, schemas.TaskCreate(title="Хлеб и молоко", position=0), test_user_id)
+    crud.create_task(db, schemas.TaskCreate(title="Позвонить"), test_user_id)
+    
+    tasks = crud.get_tasks(db, test_user_id, search="молоко", sort_by="relevance")
+    
+    assert [t.title for t in tasks] == ["Хлеб и молоко", "Купить молоко"]
+
+
+def test_search_condition_modes():
+    """Тест: в Postgres по умолчанию ищется подстрока, короткий фрагмент — по началу названия, полнотекстовый — только по запросу."""
+    pg = Session(bind=create_engine("postgresql://"))  # без подключения, только диалект
+    
+    def sql(search="отч", **kwargs):
+        return str(crud._search_condition(pg, search, **kwargs).compile(dialect=pg.get_bind().dialect))
+    
+    assert "ILIKE" in sql() and "@@" not in sql()
+    assert "ILIKE" in sql(search_mode="substring")
+    assert "@@" in sql(search_mode="fulltext") and "ILIKE" not in sql(search_mode="fulltext")
+    # Короткий фрагмент — префикс названия под индекс lower(title) text_pattern_ops
+    assert "lower(tasks.title) LIKE" in sql("от") and "ILIKE" not in sql("от")
+
+
+def test_get_tasks_read_only_rows(db, test_user_id):
+    """Тест: список читается строками, без ORM-объектов в сессии."""
+    crud.create_task(db, schemas.TaskCreate(title="A", priority="high", tags=["x"]), test_user_id)
+    db.expunge_all()
+    
+    tasks = crud.get_tasks(db, test_user_id)
+    assert len(db.identity_map) == 0
+    assert tasks[0].priority == "high"
+    assert tasks[0].tags == ["x"]
+
+
+def test_get_tasks_by_tags(db, test_user_id):
+    """Тест фильтра по нескольким тегам в режимах all и any."""
+    crud.create_task(db, schemas.TaskCreate(title="A", tags=["работа", "срочно"]), test_user_id)
+    crud.create_task(db, schemas.TaskCreate(title="B", tags=["работа"]), test_user_id)
+    crud.create_task(db, schemas.TaskCreate(title="C", tags=["дом"]), test_user_id)
+    
+    all_tags = crud.get_tasks(db, test_user_id, tags=["работа", "срочно"])
+    assert [t.title for t in all_tags] == ["A"]
+    
+    any_tag = crud.get_tasks(db, test_user_id, tags=["срочно", "дом"], tag_mode="any")
+    assert sorted(t.title for t in any_tag) == ["A", "C"]
+
+
+def test_metadata_counts(db, test_user_id):
+    """Тест сводок категорий и тегов при создании, обновлении и удалении."""
+    def counts(items):
+        return {i.name: (i.active_count, i.completed_count) for i in items}
+    
+    first = crud.create_task(
+        db, schemas.TaskCreate(title="1", category="Работа", tags=["a", "b"]), test_user_id
+    )
+    crud.create_task(db, schemas.TaskCreate(title="2", category="Работа", tags=["a"]), test_user_id)
+    
+    assert counts(crud.get_categories(db, test_user_id)) == {"Работа": (2, 0)}
+    assert counts(crud.get_all_tags(db, test_user_id)) == {"a": (2, 0), "b": (1, 0)}
+    
+    crud.update_task(
+        db, first.id, schemas.TaskUpdate(status=True, category="Дом", tags=["a"]), test_user_id
+    )
+    assert counts(crud.get_categories(db, test_user_id)) == {"Дом": (0, 1), "Работа": (1, 0)}
+    assert counts(crud.get_all_tags(db, test_user_id)) == {"a": (1, 1)}
+    
+    crud.delete_task(db, first.id, test_user_id)
+    assert counts(crud.get_categories(db, test_user_id)) == {"Работа": (1, 0)}
+    assert counts(crud.get_all_tags(db, test_user_id)) == {"a": (1, 0)}
+
+
+def test_get_tasks_sorted_by_priority(db, test_user_id):
+    """Тест сортировки по приоритету: high -> normal -> low."""
+    for priority in ("low", "high", "normal"):
+        crud.create_task(db, schemas.TaskCreate(title=priority, priority=priority), test_user_id)
+    
+    tasks = crud.get_tasks(db, test_user_id, sort_by="priority")
+    
+    assert [t.priority for t in tasks] == ["high", "normal", "low"]
+    assert [t.priority_rank for t in tasks] == [3, 2, 1]
+
+
+def test_get_tasks_sorted_by_urgency(db, test_user_id):
+    """Тест сортировки urgency: открытые по приоритету, затем по сроку, без срока — в конце."""
+    def create(title, priority="normal", date_time=None, status=False):
+        task = crud.create_task(
+            db, schemas.TaskCreate(title=title, priority=priority, date_time=date_time), test_user_id
+        )
+        if status:
+            crud.update_task(db, task.id, schemas.TaskUpdate(status=True), test_user_id)
+    
+    create("done high", "high", datetime(2020, 1, 1), status=True)
+    create("normal no date")
+    create("normal later", date_time=datetime(2030, 1, 1))
+    create("normal overdue", date_time=datetime(2020, 1, 1))
+    create("high", "high", datetime(2030, 6, 1))
+    
+    tasks = crud.get_tasks(db, test_user_id, sort_by="urgency")
+    
+    assert [t.title for t in tasks] == [
+        "high", "normal overdue", "normal later", "normal no date", "done high"
+    ]
+
+
+def test_get_task_stats(db, test_user_id):
+    """Тест счётчиков дашборда и их сброса при записи."""
+    now = crud._local_now("Europe/Moscow")
+    crud.create_task(db, schemas.TaskCreate(title="A", priority="high", date_time=now - timedelta(minutes=1)), test_user_id)
+    crud.create_task(db, schemas.TaskCreate(title="B", priority="low"), test_user_id)
+    done = crud.create_task(db, schemas.TaskCreate(title="C", date_time=now - timedelta(days=400)), test_user_id)
+    crud.update_task(db, done.id, schemas.TaskUpdate(status=True), test_user_id)
+    
+    stats = crud.get_task_stats(db, test_user_id, "Europe/Moscow")
+    assert stats["total"] == 3
+    assert (stats["completed"], stats["active"]) == (1, 2)
+    assert (stats["high_priority"], stats["normal_priority"], stats["low_priority"]) == (1, 0, 1)
+    assert stats["overdue"] == 1
+    assert stats["today"] == (1 if now.date() == (now - timedelta(minutes=1)).date() else 0)
+    
+    crud.create_task(db, schemas.TaskCreate(title="D"), test_user_id)
+    assert crud.get_task_stats(db, test_user_id, "Europe/Moscow")["total"] == 4
+
+
+def test_daily_stats(db, test_user_id):
+    """Тест дневной сводки: создание и смены статуса, бэкфилл по задачам."""
+    today = datetime.utcnow().date()
+    task = crud.create_task(db, schemas.TaskCreate(title="A"), test_user_id)
+    crud.create_task(db, schemas.TaskCreate(title="B"), test_user_id)
+    crud.update_task(db, task.id, schemas.TaskUpdate(status=True), test_user_id)
+    crud.update_task(db, task.id, schemas.TaskUpdate(status=False), test_user_id)
+    crud.update_task(db, task.id, schemas.TaskUpdate(status=True), test_user_id)
+    crud.update_task(db, task.id, schemas.TaskUpdate(title="A2"), test_user_id)
+    
+    history = crud.get_daily_stats(db, test_user_id, today - timedelta(days=1), today)
+    assert history == [
+        {"day": today - timedelta(days=1), "created": 0, "completed": 0, "reopened": 0},
+        {"day": today, "created": 2, "completed": 2, "reopened": 1},
+    ]
+    
+    assert crud.backfill_daily_stats(db) == 1
+    history = crud.get_daily_stats(db, test_user_id, today, today)
+    assert history == [{"day": today, "created": 2, "completed": 1, "reopened": 0}]
+
+
+def test_get_changes(db, test_user_id):
+    """Тест синхронизации изменений: upserts, надгробия, компакция."""
+    kept = crud.create_task(db, schemas.TaskCreate(title="A"), test_user_id)
+    removed = crud.create_task(db, schemas.TaskCreate(title="B"), test_user_id)
+    token = crud.get_changes(db, test_user_id, 0)["token"]
+    
+    crud.update_task(db, kept.id, schemas.TaskUpdate(title="A2"), test_user_id)
+    crud.delete_task(db, removed.id, test_user_id)
+    
+    changes = crud.get_changes(db, test_user_id, token)
+    assert [t.title for t in changes["upserts"]] == ["A2"]
+    assert changes["deleted"] == [removed.id]
+    assert changes["token"] == token + 2
+    assert crud.get_changes(db, test_user_id, changes["token"])["upserts"] == []
+    
+    assert crud.compact_tombstones(db, older_than_days=-1) == 1
+    with pytest.raises(SyncTokenExpiredError):
+        crud.get_changes(db, test_user_id, token)
+    assert crud.get_changes(db, test_user_id, changes["token"])["deleted"] == []
+
+
+def test_get_changes_full_sync(db, test_user_id):
+    """Тест полной синхронизации (since=0) с задачами, созданными до миграции 015."""
+    old = crud.create_task(db, schemas.TaskCreate(title="Старая"), test_user_id)
+    removed = crud.create_task(db, schemas.TaskCreate(title="Удалённая"), test_user_id)
+    crud.delete_task(db, removed.id, test_user_id)
+    # Как после миграции: changed_version=0 и ещё нет строки в user_data_versions
+    db.query(models.Task).update({models.Task.changed_version: 0})
+    db.query(models.UserDataVersion).delete()
+    db.commit()
+    
+    changes = crud.get_changes(db, test_user_id, 0)
+    assert [t.title for t in changes["upserts"]] == ["Старая"]
+    assert changes["deleted"] == []
+    assert changes["token"] == 0
+    
+    crud.create_task(db, schemas.TaskCreate(title="Новая"), test_user_id)
+    changes = crud.get_changes(db, test_user_id, 0)
+    assert [t.title for t in changes["upserts"]] == ["Старая", "Новая"]
+    assert crud.get_changes(db, test_user_id, changes["token"])["upserts"] == []
+    
+    # Компакция надгробий не ломает полную синхронизацию
+    crud.compact_tombstones(db, older_than_days=-1)
+    assert len(crud.get_changes(db, test_user_id, 0)["upserts"]) == 2
+
+
+def test_bulk_apply(db, test_user_id):
+    """Тест пакета: порядок операций, сводки и версия данных, режимы atomic/best_effort."""
+    done = crud.create_task(db, schemas.TaskCreate(title="A", category="Работа"), test_user_id)
+    gone = crud.create_task(db, schemas.TaskCreate(title="B", tags=["x"]), test_user_id)
+    done_id, gone_id = done.id, gone.id
+    version = crud.get_data_version(db, test_user_id)
+    
+    operations = [
+        schemas.BulkCreate(op="create", data=schemas.TaskCreate(title="C", tags=["x"])),
+        schemas.BulkUpdate(op="update", id=done_id, data=schemas.TaskUpdate(status=True)),
+        schemas.BulkDelete(op="delete", id=gone_id),
+    ]
+    results = crud.bulk_apply(db, test_user_id, operations)
+    assert [r["ok"] for r in results] == [True, True, True]
+    assert results[0]["task"].title == "C"
+    assert results[1]["task"].status is True
+    
+    assert sorted(t.title for t in crud.get_tasks(db, test_user_id)) == ["A", "C"]
+    assert [(c.name, c.active_count, c.completed_count) for c in crud.get_categories(db, test_user_id)] == [("Работа", 0, 1)]
+    assert [(t.name, t.active_count) for t in crud.get_all_tags(db, test_user_id)] == [("x", 1)]
+    changes = crud.get_changes(db, test_user_id, version)
+    assert changes["token"] == version + 1
+    assert changes["deleted"] == [gone_id]
+    
+    missing = [schemas.BulkUpdate(op="update", id=99999, data=schemas.TaskUpdate(title="Z")),
+               schemas.BulkUpdate(op="update", id=done_id, data=schemas.TaskUpdate(title="A2"))]
+    with pytest.raises(TaskNotFoundError):
+        crud.bulk_apply(db, test_user_id, missing)
+    db.rollback()
+    assert crud.get_task_by_id(db, done_id, test_user_id).title == "A"
+    
+    results = crud.bulk_apply(db, test_user_id, missing, atomic=False)
+    assert [r["ok"] for r in results] == [False, True]
+    assert crud.get_task_by_id(db, done_id, test_user_id).title == "A2"
+
+
+def test_tasks_where(db, test_user_id):
+    """Тест массовых изменений по фильтру: счётчик, dry_run, лимит, сводки и надгробия."""
+    for title in ("A", "B", "C"):
+        crud.create_task(db, schemas.TaskCreate(title=title, category="Работа"), test_user_id)
+    crud.create_task(db, schemas.TaskCreate(title="D", category="Дом"), test_user_id)
+    done = schemas.TaskUpdate(status=True)
+    
+    assert crud.update_tasks_where(db, test_user_id, done, dry_run=True, category="Работа") == 3
+    with pytest.raises(ValidationError):
+        crud.update_tasks_where(db, test_user_id, done, max_affected=2, category="Работа")
+    assert crud.get_tasks(db, test_user_id, status=True) == []
+    
+    assert crud.update_tasks_where(db, test_user_id, done, category="Работа") == 3
+    assert [(c.name, c.active_count, c.completed_count) for c in crud.get_categories(db, test_user_id)] == [
+        ("Дом", 1, 0), ("Работа", 0, 3)
+    ]
+    
+    version = crud.get_data_version(db, test_user_id)
+    assert crud.delete_tasks_where(db, test_user_id, status=True) == 3
+    assert [t.title for t in crud.get_tasks(db, test_user_id)] == ["D"]
+    assert [c.name for c in crud.get_categories(db, test_user_id)] == ["Дом"]
+    assert len(crud.get_changes(db, test_user_id, version)["deleted"]) == 3
+    assert crud.delete_tasks_where(db, test_user_id, status=True) == 0
+    
+    # Без фильтров — только с явным all_tasks
+    with pytest.raises(ValidationError):
+        crud.delete_tasks_where(db, test_user_id)
+    assert crud.delete_tasks_where(db, test_user_id, dry_run=True, all_tasks=True) == 1
+
+
+def test_move_task(db, test_user_id):
+    """Тест перемещения: новые задачи в конец, перемещение меняет одну позицию, без места — перенумерация."""
+    ids = [crud.create_task(db, schemas.TaskCreate(title=title), test_user_id).id for title in "ABCD"]
+    positions = [crud.get_task_by_id(db, task_id, test_user_id).position for task_id in ids]
+    assert positions == [crud.POSITION_GAP * i for i in range(1, 5)]
+    
+    def order():
+        return [t.title for t in crud.get_tasks(db, test_user_id)]
+    
+    task, needs_rebalance = crud.move_task(db, ids[3], test_user_id, before_id=ids[0])
+    assert order() == ["D", "A", "B", "C"]
+    assert not needs_rebalance
+    crud.move_task(db, ids[0], test_user_id, after_id=ids[2])
+    assert order() == ["D", "B", "C", "A"]
+    
+    # Повторные перемещения в одно место исчерпывают зазор: сначала просим
+    # перенумерацию в фоне, а когда места не остаётся, она выполняется сразу
+    flags = []
+    for _ in range(30):
+        flags.append(crud.move_task(db, ids[1], test_user_id, after_id=ids[3], before_id=ids[2])[1])
+        flags.append(crud.move_task(db, ids[2], test_user_id, after_id=ids[3], before_id=ids[1])[1])
+    assert order() == ["D", "C", "B", "A"]
+    assert any(flags) and not all(flags)
+    
+    crud.rebalance_positions(db, test_user_id)
+    assert [t.position for t in crud.get_tasks(db, test_user_id)] == [crud.POSITION_GAP * i for i in range(1, 5)]
+    
+    with pytest.raises(TaskNotFoundError):
+        crud.move_task(db, ids[0], test_user_id, after_id=99999)
+    with pytest.raises(ValidationError):
+        crud.move_task(db, ids[0], test_user_id)
@@ -41,7 +41,11 @@ function App() {
     try {
       // Строим query-параметры
       const params = new URLSearchParams();
-      if (currentFilters.search) params.append('search', currentFilters.search);
+      if (currentFilters.search) {
+        // Поиск по мере ввода: подстрока находит и недописанное слово
+        params.append('search', currentFilters.search);
+        params.append('search_mode', 'substring');
+      }
       if (currentFilters.status !== 'all') params.append('status', currentFilters.status);
       if (currentFilters.priority !== 'all') params.append('priority', currentFilters.priority);
       if (currentFilters.category) params.append('category', currentFilters.category);
@@ -81,18 +85,43 @@ function App() {
     } catch {}
   }, [theme]);
 
-  const handleTaskMove = useCallback((sourceId, targetId) => {
-    setTasks(prevTasks => {
-      const newTasks = [...prevTasks];
-      const sourceIndex = prevTasks.findIndex(t => t.id === sourceId);
-      const targetIndex = prevTasks.findIndex(t => t.id === targetId);
-      
-      const [removed] = newTasks.splice(sourceIndex, 1);
-      newTasks.splice(targetIndex, 0, removed);
-      
-      return newTasks;
-    });
-  }, []);
+  const handleTaskMove = useCallback(async (sourceId, targetId) => {
+    const sourceIndex = tasks.findIndex(t => t.id === sourceId);
+    const targetIndex = tasks.findIndex(t => t.id === targetId);
+    if (sourceIndex === -1 || targetIndex === -1) return;
+
+    // Оптимистичное обновление UI
+    const prevTasks = tasks;
+    const newTasks = [...tasks];
+    const [removed] = newTasks.splice(sourceIndex, 1);
+    newTasks.splice(targetIndex, 0, removed);
+    setTasks(newTasks);
+
+    // Ручной порядок хранится только для сортировки по позиции
+    if (sortBy !== 'position') return;
+
+    try {
+      // Сервер ставит задачу между соседями — меняется позиция одной задачи
+      const response = await fetch(`${API_BASE}/tasks/${sourceId}/move`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'application/json',
+        },
+        body: JSON.stringify({
+          after_id: newTasks[targetIndex - 1]?.id ?? null,
+          before_id: newTasks[targetIndex + 1]?.id ?? null,
+        }),
+      });
+      if (!response.ok) {
+        console.error('Ошибка ответа сервера:', response.status, await response.text());
+        setTasks(prevTasks);
+      }
+    } catch (error) {
+      console.error('Ошибка перемещения задачи:', error);
+      setTasks(prevTasks);
+    }
+  }, [tasks, sortBy]);
 
   const handleAddTask = useCallback(async (taskData) => {
     try {
@@ -108,8 +137,7 @@ function App() {
           date_time: taskData.dateTime,
           priority: taskData.priority,
           category: taskData.category || null,
-          status: false,
-          position: tasks.length
+          status: false
         }),
       });
 
@@ -134,7 +162,7 @@ function App() {
       });
       throw error;
     }
-  }, [tasks.length, fetchTasks, webApp]);
+  }, [fetchTasks, webApp]);
 
   const handleStatusChange = useCallback(async (taskId) => {
     const task = tasks.find(t => t.id === taskId);
@@ -207,12 +235,17 @@ function App() {
 
   const handleUpdateTask = useCallback(async (taskId, taskData) => {
     try {
+      const headers = {
+        'Content-Type': 'application/json',
+        'Accept': 'application/json',
+      };
+      // Сохраняем, только если задачу не изменили с другого устройства, пока открыт редактор
+      if (editingTask?.id === taskId && editingTask.version) {
+        headers['If-Match'] = `"${editingTask.version}"`;
+      }
       const response = await fetch(`${API_BASE}/tasks/${taskId}`, {
         method: 'PUT',
-        headers: {
-          'Content-Type': 'application/json',
-          'Accept': 'application/json',
-        },
+        headers,
         body: JSON.stringify({
           title: taskData.title,
           description: taskData.description,
@@ -222,6 +255,10 @@ function App() {
         }),
       });
 
+      if (response.status === 412) {
+        await fetchTasks();
+        throw new Error('Задача изменена на другом устройстве. Откройте её заново');
+      }
       if (!response.ok) {
         const error = await response.text();
         throw new Error(error || 'Ошибка при обновлении задачи');
@@ -243,7 +280,7 @@ function App() {
       });
       throw error;
     }
-  }, [fetchTasks, webApp]);
+  }, [editingTask, fetchTasks, webApp]);
 
   return (
     <div className={`tg-webapp theme-${theme}`}>
@@ -255,6 +292,7 @@ function App() {
       <main className="tg-main">
         {mode === "calendar" && (
           <CalendarView
+            apiBase={API_BASE}
             theme={theme}
             tasks={tasks}
             onTaskMove={handleTaskMove}
@@ -263,7 +301,7 @@ function App() {
         )}
         {mode === "tasks" && (
           <>
-            <TaskStats tasks={tasks} />
+            <TaskStats apiBase={API_BASE} tasks={tasks} />
             <TaskFilters onFilterChange={handleFilterChange} initialFilters={filters} />
             <TaskSorter sortBy={sortBy} onSortChange={handleSortChange} />
             <TaskList
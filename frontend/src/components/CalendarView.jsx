@@ -1,7 +1,7 @@
-import React, { useState } from 'react';
+import React, { useEffect, useState } from 'react';
 import { Calendar, dateFnsLocalizer } from 'react-big-calendar';
 import { DndContext, closestCenter, useSensor, useSensors, PointerSensor } from '@dnd-kit/core';
-import { format, parse, startOfWeek, getDay } from 'date-fns';
+import { format, parse, startOfWeek, endOfWeek, startOfMonth, endOfMonth, startOfDay, addDays, getDay } from 'date-fns';
 import { ru } from 'date-fns/locale';
 import 'react-big-calendar/lib/css/react-big-calendar.css';
 import './CalendarView.css';
@@ -29,9 +29,54 @@ const formats = {
     `${localizer.format(start, 'd MMM', culture)} – ${localizer.format(end, 'd MMM', culture)}`,
 };
 
-function CalendarView({ theme, tasks = [], onTaskMove, onEditTask }) {
+// Окно [from, to) видимого диапазона календаря
+const visibleRange = (view, date) => {
+  const options = { locale: ru };
+  if (view === 'month') {
+    const from = startOfWeek(startOfMonth(date), options);
+    return [from, startOfDay(addDays(endOfWeek(endOfMonth(date), options), 1))];
+  }
+  if (view === 'week') {
+    const from = startOfWeek(date, options);
+    return [from, addDays(from, 7)];
+  }
+  // day — одни сутки, agenda — 30 дней, как показывает react-big-calendar
+  const from = startOfDay(date);
+  return [from, addDays(from, view === 'agenda' ? 30 : 1)];
+};
+
+// Локальное время без часового пояса — так же хранится date_time
+const toLocalParam = (d) => format(d, "yyyy-MM-dd'T'HH:mm:ss");
+
+// Задачи видимого окна загружаются с сервера (GET /tasks/calendar) постранично;
+// tasks нужен только как сигнал, что задачи изменились и окно пора обновить
+function CalendarView({ apiBase, theme, tasks = [], onTaskMove, onEditTask }) {
   const [view, setView] = useState('week');
   const [date, setDate] = useState(new Date());
+  const [rangeTasks, setRangeTasks] = useState([]);
+
+  useEffect(() => {
+    let cancelled = false;
+    const [from, to] = visibleRange(view, date);
+
+    const fetchRange = async () => {
+      const loaded = [];
+      let cursor = null;
+      do {
+        const params = new URLSearchParams({ from: toLocalParam(from), to: toLocalParam(to) });
+        if (cursor) params.append('cursor', cursor);
+        const response = await fetch(`${apiBase}/tasks/calendar?${params.toString()}`, {
+          headers: { 'Accept': 'application/json' },
+        });
+        loaded.push(...await response.json());
+        cursor = response.headers.get('X-Next-Cursor');
+      } while (cursor && !cancelled);
+      if (!cancelled) setRangeTasks(loaded);
+    };
+
+    fetchRange().catch(error => console.error('Ошибка загрузки календаря:', error));
+    return () => { cancelled = true; };
+  }, [apiBase, view, date, tasks]);
 
   const sensors = useSensors(
     useSensor(PointerSensor, {
@@ -41,7 +86,7 @@ function CalendarView({ theme, tasks = [], onTaskMove, onEditTask }) {
     })
   );
 
-  const events = tasks.map(task => {
+  const events = rangeTasks.map(task => {
     const start = new Date(task.date_time);
     // Устанавливаем конец события на час позже начала
     const end = new Date(start);
@@ -64,9 +109,19 @@ function CalendarView({ theme, tasks = [], onTaskMove, onEditTask }) {
     }
   };
 
-  const handleDoubleClickEvent = (event) => {
-    // Находим оригинальную задачу по id
-    const task = tasks.find(t => t.id === event.id);
+  const handleDoubleClickEvent = async (event) => {
+    // В календаре только поля для ячейки — полную задачу берём из списка или с сервера
+    let task = tasks.find(t => t.id === event.id);
+    if (!task) {
+      try {
+        const response = await fetch(`${apiBase}/tasks/${event.id}`, {
+          headers: { 'Accept': 'application/json' },
+        });
+        task = await response.json();
+      } catch (error) {
+        console.error('Ошибка загрузки задачи:', error);
+      }
+    }
     if (task && onEditTask) {
       onEditTask(task);
     }
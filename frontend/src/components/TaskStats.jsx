@@ -1,36 +1,37 @@
-import React, { useMemo } from "react";
+import React, { useEffect, useState } from "react";
 import "./TaskStats.css";
 
-function TaskStats({ tasks }) {
-  const stats = useMemo(() => {
-    const now = new Date();
-    const today = new Date(now.getFullYear(), now.getMonth(), now.getDate());
-    
-    return {
-      total: tasks.length,
-      completed: tasks.filter(t => t.status).length,
-      active: tasks.filter(t => !t.status).length,
-      
-      // Приоритеты
-      highPriority: tasks.filter(t => t.priority === 'high' && !t.status).length,
-      normalPriority: tasks.filter(t => t.priority === 'normal' && !t.status).length,
-      lowPriority: tasks.filter(t => t.priority === 'low' && !t.status).length,
-      
-      // Сегодняшние задачи
-      todayTasks: tasks.filter(t => {
-        if (!t.date_time) return false;
-        const taskDate = new Date(t.date_time);
-        return taskDate.toDateString() === today.toDateString();
-      }).length,
-      
-      // Просроченные задачи
-      overdue: tasks.filter(t => {
-        if (!t.date_time || t.status) return false;
-        const taskDate = new Date(t.date_time);
-        return taskDate < now;
-      }).length,
-    };
-  }, [tasks]);
+const EMPTY_STATS = {
+  total: 0,
+  completed: 0,
+  active: 0,
+  highPriority: 0,
+  todayTasks: 0,
+  overdue: 0,
+};
+
+// Счётчики считает сервер (GET /tasks/stats) по всем задачам пользователя;
+// tasks нужен только как сигнал, что задачи изменились и пора обновить статистику
+function TaskStats({ apiBase, tasks }) {
+  const [stats, setStats] = useState(EMPTY_STATS);
+
+  useEffect(() => {
+    const tz = Intl.DateTimeFormat().resolvedOptions().timeZone;
+    const params = new URLSearchParams(tz ? { tz } : {});
+    fetch(`${apiBase}/tasks/stats?${params.toString()}`, {
+      headers: { 'Accept': 'application/json' },
+    })
+      .then(response => response.json())
+      .then(data => setStats({
+        total: data.total,
+        completed: data.completed,
+        active: data.active,
+        highPriority: data.high_priority,
+        todayTasks: data.today,
+        overdue: data.overdue,
+      }))
+      .catch(error => console.error('Ошибка загрузки статистики:', error));
+  }, [apiBase, tasks]);
 
   const completionRate = stats.total > 0 
     ? Math.round((stats.completed / stats.total) * 100) 